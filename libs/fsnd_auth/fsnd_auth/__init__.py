@@ -0,0 +1,5 @@
+from .auth import Auth, SigningKey, VerifiedToken, parse_rsa_key
+from .errors import AuthError
+from .jwks import JWKSStore
+from .metrics import AuthMetrics
+from .token_cache import TokenCache
@@ -0,0 +1,216 @@
+import time
+from collections import namedtuple
+from functools import wraps
+
+from flask import request
+from jose import jwk, jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+
+from .errors import AuthError, error
+from .jwks import JWKSStore
+from .metrics import AuthMetrics
+from .token_cache import TokenCache
+
+# A key of the JWKS, parsed once per fetch instead of once per request
+SigningKey = namedtuple('SigningKey', 'kid algorithm key')
+
+# The claims of a verified token and its permissions, ready for the
+# subset checks of requires_auth()
+VerifiedToken = namedtuple('VerifiedToken', 'claims permissions')
+
+# jose.jwt.decode() checks these claims when they are there, they must be
+REQUIRED_CLAIMS = ('exp', 'aud', 'iss')
+
+'''
+parse_rsa_key(key)
+    the RSA public key of a JWK, for JWKSStore(parse_key=...)
+'''
+def parse_rsa_key(key):
+    if key.get('kty') != 'RSA' or key.get('use', 'sig') != 'sig':
+        raise ValueError('Not an RSA signing key')
+    algorithm = key.get('alg', 'RS256')
+    return SigningKey(key['kid'], algorithm, jwk.construct(key, algorithm))
+
+
+def parse_permissions(claims):
+    permissions = claims.get('permissions')
+    if not isinstance(permissions, (list, tuple)):
+        return None
+    return frozenset(permissions)
+
+
+'''
+Auth
+    verification of the Auth0 access tokens of one API (its tenant domain
+    and audience), shared by the Flask apps of the course.
+
+    - the signing keys are kept in a JWKSStore as parsed RSA public keys,
+      which jose.jwt.decode() checks the signature and claims with
+    - verified tokens are kept in a TokenCache until they expire, along with
+      their permissions as a frozenset
+    - the time spent in each stage of the verification is recorded in an
+      AuthMetrics (see stats())
+
+    requires_auth(permission) passes the claims of the token to the view
+    when `pass_payload` is set.
+'''
+class Auth:
+
+    def __init__(self, domain, audience, algorithms=('RS256',), pass_payload=False, leeway=0,
+                 jwks_store=None, token_cache=None):
+        self.domain = domain
+        self.audience = audience
+        self.algorithms = frozenset(algorithms)
+        self.issuer = f'https://{domain}/'
+        self.pass_payload = pass_payload
+        self.leeway = leeway
+        self.jwks_store = jwks_store or JWKSStore(f'https://{domain}/.well-known/jwks.json', parse_key=parse_rsa_key)
+        self.token_cache = token_cache if token_cache is not None else TokenCache()
+        self.metrics = AuthMetrics()
+
+    '''
+    get_token_auth_header()
+        the token of the "Authorization: Bearer <token>" header of the request
+    '''
+    def get_token_auth_header(self):
+        auth = request.headers.get('Authorization', None)
+        if not auth:
+            raise error('authorization_header_missing', 'Authorization header is expected.', 401)
+
+        parts = auth.split()
+        if not parts or parts[0].lower() != 'bearer':
+            raise error('invalid_header', 'Authorization header must start with "Bearer".', 401)
+        elif len(parts) == 1:
+            raise error('invalid_header', 'Token not found.', 401)
+        elif len(parts) > 2:
+            raise error('invalid_header', 'Authorization header must be bearer token.', 401)
+
+        return parts[1]
+
+    '''
+    verify(token)
+        the VerifiedToken of a bearer token, from the token cache or after
+        checking its signature and claims
+    '''
+    def verify(self, token):
+        timings = []
+        start = time.perf_counter()
+
+        def lap(stage):
+            nonlocal start
+            now = time.perf_counter()
+            timings.append((stage, now - start))
+            start = now
+
+        try:
+            verified = self.token_cache.get(token)
+            lap('cache_lookup')
+            if verified is not None:
+                self.metrics.record(timings, cache_hit=True)
+                return verified
+
+            header = self.parse_token(token)
+            lap('header_parse')
+
+            signing_key = self.jwks_store.get(header['kid'])
+            lap('key_lookup')
+            if signing_key is None:
+                raise error('invalid_header', 'Unable to find the appropriate key.', 400)
+            if header['alg'] != signing_key.algorithm:
+                raise error('invalid_header', 'Token signed with an unexpected algorithm.', 401)
+
+            claims = self.decode(token, signing_key)
+            lap('signature_verify')
+
+            self.check_claims(claims)
+            lap('claim_check')
+            verified = VerifiedToken(claims, parse_permissions(claims))
+            self.token_cache.put(token, claims, verified)
+        except AuthError as auth_error:
+            self.metrics.record(timings, rejected=auth_error.error['code'])
+            raise
+
+        self.metrics.record(timings)
+        return verified
+
+    def parse_token(self, token):
+        # The header of a token, before its signature is checked
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            raise error('invalid_header', 'Unable to parse authentication token.', 400)
+
+        if 'kid' not in header:
+            raise error('invalid_header', 'Authorization malformed.', 401)
+        if header.get('alg') not in self.algorithms:
+            raise error('invalid_header', 'Token signed with an unexpected algorithm.', 401)
+        return header
+
+    def decode(self, token, signing_key):
+        # The claims of a token, once jose checked its signature with the
+        # key and the values of its exp, nbf, aud and iss claims
+        try:
+            return jwt.decode(token, signing_key.key, algorithms=[signing_key.algorithm], audience=self.audience,
+                              issuer=self.issuer, options={'leeway': self.leeway})
+        except ExpiredSignatureError:
+            raise error('token_expired', 'Token expired.', 401)
+        except JWTClaimsError:
+            raise error('invalid_claims', 'Incorrect claims. Please, check the audience and issuer.', 401)
+        except JWTError:
+            raise error('invalid_signature', 'Token signature is invalid.', 401)
+
+    def check_claims(self, claims):
+        # jose only checks the claims the token has
+        if 'exp' not in claims:
+            raise error('invalid_claims', 'Token has no expiration time.', 401)
+        if any(claim not in claims for claim in REQUIRED_CLAIMS):
+            raise error('invalid_claims', 'Incorrect claims. Please, check the audience and issuer.', 401)
+
+    '''
+    verify_decode_jwt(token)
+        the claims of a verified token
+    '''
+    def verify_decode_jwt(self, token):
+        return self.verify(token).claims
+
+    '''
+    check_permissions(permission, payload)
+        raises an AuthError unless the claims grant the permission (or all
+        the space-separated permissions)
+    '''
+    def check_permissions(self, permission, payload):
+        return self.authorize(frozenset(permission.split()), parse_permissions(payload))
+
+    def authorize(self, required, permissions):
+        if permissions is None:
+            raise error('invalid_payload', 'Payload does not contain a permissions list.', 401)
+        if not required <= permissions:
+            raise error('unauthorized', 'Necessary permission is not given.', 403)
+        return True
+
+    '''
+    @requires_auth(permission)
+        a decorator checking that the request carries a valid token with
+        the permission (or all the space-separated permissions)
+    '''
+    def requires_auth(self, permission=''):
+        required = frozenset(permission.split())
+
+        def requires_auth_decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                verified = self.verify(self.get_token_auth_header())
+                self.authorize(required, verified.permissions)
+                if self.pass_payload:
+                    return f(verified.claims, *args, **kwargs)
+                return f(*args, **kwargs)
+
+            return wrapper
+        return requires_auth_decorator
+
+    def stats(self):
+        return {
+            'jwks': self.jwks_store.stats(),
+            'token_cache': self.token_cache.stats(),
+            'verification': self.metrics.format()
+        }
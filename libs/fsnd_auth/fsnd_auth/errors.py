@@ -0,0 +1,12 @@
+'''
+AuthError Exception
+A standardized way to communicate auth failure modes
+'''
+class AuthError(Exception):
+    def __init__(self, error, status_code):
+        self.error = error
+        self.status_code = status_code
+
+
+def error(code, description, status_code):
+    return AuthError({'code': code, 'description': description}, status_code)
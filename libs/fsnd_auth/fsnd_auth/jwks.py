@@ -0,0 +1,165 @@
+import json
+import logging
+import re
+import threading
+import time
+from urllib.request import urlopen
+
+from .errors import error
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE = re.compile(r'(?:^|,)\s*max-age\s*=\s*"?(\d+)"?', re.IGNORECASE)
+
+'''
+JWKSStore
+    the signing keys of the identity provider, fetched from its JWKS
+    endpoint and indexed by key id (kid), instead of being downloaded on
+    every authenticated request.
+
+    - the keys are kept for the max-age of the Cache-Control header of the
+      JWKS response (within [min_ttl, max_ttl]), or `ttl` seconds without one
+    - once that time is up, requests keep using the current keys while a
+      background thread fetches them again
+    - a kid that isn't known (the provider rotated its keys) triggers a
+      fetch right away, at most once every `refetch_interval` seconds so
+      that made-up kids can't flood the provider; threads that need a fetch
+      while one is running wait for it instead of starting their own
+    - when a fetch fails the current keys are kept, and retried after
+      `retry_interval` seconds. Without keys (the first fetch failed),
+      requests fail with a 503 AuthError right away until then, instead of
+      each one waiting for the provider in turn
+
+    `parse_key` turns every JWK into the object requests use (the RSA
+    public key, see auth.py), once per fetch; keys it rejects are skipped.
+    `fetch` and `clock` can be replaced, e.g. by tests.
+'''
+class JWKSStore:
+
+    def __init__(self, url, ttl=600, min_ttl=60, max_ttl=86400, refetch_interval=30,
+                 retry_interval=30, timeout=5, parse_key=None, fetch=None, clock=time.monotonic):
+        self.url = url
+        self.ttl = ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.refetch_interval = refetch_interval
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self.parse_key = parse_key
+        self.fetch = fetch or self.fetch_jwks
+        self.clock = clock
+
+        self.keys = {}
+        self.fetched_at = None
+        self.refresh_at = 0
+        self.last_refetch = None
+        # Incremented by every successful fetch
+        self.generation = 0
+        # Incremented by every fetch, so that threads that waited for one
+        # (successful or not) don't start another one
+        self.attempts = 0
+        self.failures = 0
+        self.failed_at = None
+        self.fetch_lock = threading.Lock()
+        self.state_lock = threading.Lock()
+        self.refreshing = False
+
+    def fetch_jwks(self):
+        # (JWKS document, max-age of its Cache-Control header or None)
+        with urlopen(self.url, timeout=self.timeout) as response:
+            jwks = json.loads(response.read())
+            match = MAX_AGE.search(response.headers.get('Cache-Control', ''))
+        return jwks, int(match.group(1)) if match else None
+
+    def refresh(self):
+        '''
+        refresh()
+            fetches the keys unless another thread did while this one waited
+            for it; returns whether the store has keys
+        '''
+        attempts = self.attempts
+        with self.fetch_lock:
+            if self.attempts != attempts:
+                return bool(self.keys)
+            try:
+                jwks, max_age = self.fetch()
+                keys = self.parse_keys(jwks['keys'])
+            except Exception:
+                self.attempts += 1
+                self.failures += 1
+                self.failed_at = self.clock()
+                self.refresh_at = self.failed_at + self.retry_interval
+                logger.exception('Could not fetch the JWKS from %s, keeping the %d known keys', self.url, len(self.keys))
+                return bool(self.keys)
+
+            ttl = self.ttl if max_age is None else min(max(max_age, self.min_ttl), self.max_ttl)
+            now = self.clock()
+            self.keys = keys
+            self.fetched_at = now
+            self.failed_at = None
+            self.refresh_at = now + ttl
+            self.generation += 1
+            self.attempts += 1
+            return True
+
+    def parse_keys(self, jwks):
+        keys = {}
+        for jwk in jwks:
+            if 'kid' not in jwk:
+                continue
+            if self.parse_key is None:
+                keys[jwk['kid']] = jwk
+                continue
+            try:
+                keys[jwk['kid']] = self.parse_key(jwk)
+            except Exception:
+                logger.warning('Skipping the key %s of %s, which could not be parsed', jwk['kid'], self.url, exc_info=True)
+        return keys
+
+    def refresh_in_background(self):
+        with self.state_lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self.refreshing = False
+
+        threading.Thread(target=run, name='jwks-refresh', daemon=True).start()
+
+    def get(self, kid):
+        '''
+        get(kid)
+            the (parsed) key of the key id, or None if the provider doesn't
+            have it; raises a 503 AuthError when there are no keys to look
+            it up in
+        '''
+        if not self.keys:
+            backing_off = self.failed_at is not None and self.clock() < self.refresh_at
+            if backing_off or not self.refresh():
+                raise error('jwks_unavailable', 'Unable to fetch the signing keys.', 503)
+        elif self.clock() >= self.refresh_at:
+            self.refresh_in_background()
+
+        key = self.keys.get(kid)
+        if key is None and self.keys:
+            with self.state_lock:
+                now = self.clock()
+                refetch = self.last_refetch is None or now - self.last_refetch >= self.refetch_interval
+                if refetch:
+                    self.last_refetch = now
+            if refetch:
+                self.refresh()
+                key = self.keys.get(kid)
+        return key
+
+    def stats(self):
+        return {
+            'keys': len(self.keys),
+            'age': round(self.clock() - self.fetched_at, 3) if self.fetched_at is not None else None,
+            'fetches': self.generation,
+            'failures': self.failures
+        }
@@ -0,0 +1,47 @@
+import threading
+
+# The stages of the verification of a token, in order
+STAGES = ('cache_lookup', 'header_parse', 'key_lookup', 'signature_verify', 'claim_check')
+
+'''
+AuthMetrics
+    how long each stage of the verification of bearer tokens took (count,
+    average and max, in ms), how many tokens came from the token cache and
+    how many were rejected, by error code
+'''
+class AuthMetrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = 0
+        self.cache_hits = 0
+        self.rejected = {}
+        self.counts = dict.fromkeys(STAGES, 0)
+        self.totals = dict.fromkeys(STAGES, 0.0)
+        self.maxima = dict.fromkeys(STAGES, 0.0)
+
+    def record(self, timings, cache_hit=False, rejected=None):
+        # timings: (stage, seconds) of the stages the token went through
+        with self.lock:
+            self.tokens += 1
+            self.cache_hits += cache_hit
+            if rejected is not None:
+                self.rejected[rejected] = self.rejected.get(rejected, 0) + 1
+            for stage, seconds in timings:
+                self.counts[stage] += 1
+                self.totals[stage] += seconds
+                if seconds > self.maxima[stage]:
+                    self.maxima[stage] = seconds
+
+    def format(self):
+        with self.lock:
+            return {
+                'tokens': self.tokens,
+                'cache_hits': self.cache_hits,
+                'rejected': dict(self.rejected),
+                'stages_ms': {stage: {
+                    'count': self.counts[stage],
+                    'average': round(self.totals[stage] * 1000 / self.counts[stage], 3) if self.counts[stage] else 0.0,
+                    'max': round(self.maxima[stage] * 1000, 3)
+                } for stage in STAGES}
+            }
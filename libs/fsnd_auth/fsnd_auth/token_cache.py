@@ -0,0 +1,131 @@
+import hashlib
+import heapq
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Rough per-entry cost beyond the claims themselves: digest key, list,
+# OrderedDict node and heap entry
+ENTRY_OVERHEAD = 200
+
+'''
+TokenCache
+    the verified claims of bearer tokens, so that a client calling the API
+    many times with the same token pays for the RS256 signature check once
+    per token instead of once per request.
+
+    - entries are keyed by the SHA-256 digest of the token (the tokens
+      themselves aren't kept) and looked up in a dict, in constant time
+    - an entry is only served until the `exp` claim of its token, and tokens
+      without `exp` aren't cached
+    - the cache holds at most `max_entries` tokens and about `max_bytes`
+      bytes of claims; when it is full, expired entries are dropped first
+      (a heap ordered by `exp`), then the least recently used ones
+
+    Only tokens that were fully verified may be put in the cache: a hit
+    skips the signature and claim checks.
+'''
+class TokenCache:
+
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024, clock=time.time):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+
+        # digest: [claims or value, exp, size], least recently used first
+        self.entries = OrderedDict()
+        # (exp, digest); may hold entries that were evicted or replaced since
+        self.expiries = []
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        '''
+        get(token)
+            the cached claims (or value) of the token, or None
+        '''
+        key = self.digest(token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] <= self.clock():
+                self.remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token, claims, value=None):
+        '''
+        put(token, claims, value=None)
+            caches `value` (by default the claims) until the exp claim
+        '''
+        exp = claims.get('exp')
+        if not isinstance(exp, (int, float)) or exp <= self.clock():
+            return
+        size = len(json.dumps(claims)) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        key = self.digest(token)
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = [claims if value is None else value, exp, size]
+            self.size += size
+            heapq.heappush(self.expiries, (exp, key))
+            if len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self.evict()
+
+    def remove(self, key):
+        self.size -= self.entries.pop(key)[2]
+
+    def evict(self):
+        # Expired entries first
+        now = self.clock()
+        while self.expiries and self.expiries[0][0] <= now:
+            exp, key = heapq.heappop(self.expiries)
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == exp:
+                self.remove(key)
+                self.expirations += 1
+
+        # Then the least recently used
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            key, entry = self.entries.popitem(last=False)
+            self.size -= entry[2]
+            self.evictions += 1
+
+        # Keep the heap from growing with entries that are gone
+        if len(self.expiries) > 2 * len(self.entries) + 64:
+            self.expiries = [(entry[1], key) for key, entry in self.entries.items()]
+            heapq.heapify(self.expiries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.expiries = []
+            self.size = 0
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
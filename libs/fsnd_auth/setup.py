@@ -0,0 +1,13 @@
+from setuptools import setup
+
+# The apps pin their own Flask. jose.jwt.decode() takes the parsed keys of
+# the JWKSStore (jose Key objects) from python-jose 3.2 on; the
+# python-jose-cryptodome fork (1.3) can't use them
+setup(
+    name='fsnd-auth',
+    version='0.1.0',
+    description='Auth0 access token verification for the Flask APIs of the FSND projects',
+    packages=['fsnd_auth'],
+    install_requires=['python-jose>=3.2'],
+    python_requires='>=3.6'
+)
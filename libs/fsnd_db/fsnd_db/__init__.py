@@ -0,0 +1 @@
+from .pool_metrics import InstrumentedQueuePool, PoolStats, engine_options, pool_metrics, pool_options
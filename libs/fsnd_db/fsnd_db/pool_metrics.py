@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds, in milliseconds, of the checkout latency histogram
+LATENCY_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+def parse_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+# Config key (app.config, then environment) -> create_engine() option and its type
+POOL_SETTINGS = {
+    'DB_POOL_SIZE': ('pool_size', int),
+    'DB_MAX_OVERFLOW': ('max_overflow', int),
+    'DB_POOL_TIMEOUT': ('pool_timeout', float),
+    'DB_POOL_RECYCLE': ('pool_recycle', int),
+    'DB_POOL_PRE_PING': ('pool_pre_ping', parse_bool)
+}
+
+'''
+pool_options(config)
+    the create_engine() pool options set in the app config or, failing
+    that, in the environment; unset ones keep the SQLAlchemy defaults
+'''
+def pool_options(config, environ=os.environ):
+    options = {}
+    for key, (option, convert) in POOL_SETTINGS.items():
+        value = config.get(key, environ.get(key))
+        if value is not None and value != '':
+            options[option] = convert(value)
+    return options
+
+'''
+engine_options(config, database_path)
+    the SQLALCHEMY_ENGINE_OPTIONS of an app: the pool options of the
+    config, with an InstrumentedQueuePool. In-memory SQLite keeps its
+    single shared connection, without a pool to size.
+'''
+def engine_options(config, database_path, environ=os.environ):
+    options = pool_options(config, environ)
+    url = make_url(database_path)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {option: value for option, value in options.items() if option in ('pool_pre_ping', 'pool_recycle')}
+
+    options['poolclass'] = InstrumentedQueuePool
+    if url.get_backend_name() == 'sqlite':
+        # Flask-SQLAlchemy doesn't pool SQLite file connections by default;
+        # pooled connections are handed from one thread to the next
+        options['connect_args'] = {'check_same_thread': False}
+    return options
+
+'''
+PoolStats
+    counters of an InstrumentedQueuePool: checkouts, how long they took,
+    how many had to wait for a connection to be returned and how many gave
+    up after pool_timeout
+'''
+class PoolStats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.peak_overflow = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, latency, waited, timed_out, overflow):
+        latency_ms = latency * 1000
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if latency_ms <= bound), len(LATENCY_BUCKETS_MS))
+        with self.lock:
+            self.waits += waited
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.latency_buckets[bucket] += 1
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def format(self):
+        with self.lock:
+            buckets = {f'le_{bound}': count for bound, count in zip(LATENCY_BUCKETS_MS, self.latency_buckets)}
+            buckets['inf'] = self.latency_buckets[-1]
+            return {
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'peak_overflow': self.peak_overflow,
+                'checkout_latency_ms': {
+                    'average': round(self.latency_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                    'max': round(self.latency_max * 1000, 3),
+                    'buckets': buckets
+                }
+            }
+
+'''
+InstrumentedQueuePool
+    the default SQLAlchemy pool, timing every checkout. A checkout waits
+    when every connection is checked out and the overflow is used up.
+    _do_get() is where every checkout of a QueuePool takes (or waits for)
+    a connection, whichever public method the engine called.
+'''
+class InstrumentedQueuePool(QueuePool):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        waited = self.checkedin() == 0 and self._max_overflow > -1 and self.overflow() >= self._max_overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, waited, True, self.overflow())
+            raise
+        self.stats.record(time.perf_counter() - start, waited, False, self.overflow())
+        return connection
+
+    def recreate(self):
+        # dispose() replaces the pool: keep counting in the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+'''
+pool_metrics(engine)
+    the current state and counters of the pool of an engine, for /metrics
+'''
+def pool_metrics(engine):
+    pool = engine.pool
+    metrics = {'class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow()
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        metrics.update(pool.stats.format())
+    return metrics
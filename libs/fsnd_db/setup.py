@@ -0,0 +1,10 @@
+from setuptools import setup
+
+# The apps pin their own SQLAlchemy, so it isn't listed here
+setup(
+    name='fsnd-db',
+    version='0.1.0',
+    description='Instrumented SQLAlchemy connection pool for the Flask APIs of the FSND projects',
+    packages=['fsnd_db'],
+    python_requires='>=3.6'
+)
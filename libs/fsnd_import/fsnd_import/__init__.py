@@ -0,0 +1,2 @@
+from .formats import FORMATS, format_for_filename, format_for_mimetype, read_rows
+from .report import MAX_ERRORS, ImportReport
@@ -0,0 +1,42 @@
+import csv
+import json
+
+FORMATS = ('csv', 'jsonl')
+
+
+def format_for_filename(filename):
+    # 'shows.csv' -> 'csv', 'shows.jsonl' / 'shows.ndjson' -> 'jsonl'
+    extension = filename.rsplit('.', 1)[-1].lower()
+    if extension == 'csv':
+        return 'csv'
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    return None
+
+
+def format_for_mimetype(mimetype):
+    if mimetype == 'text/csv':
+        return 'csv'
+    if mimetype in ('application/jsonl', 'application/x-ndjson', 'application/x-jsonlines'):
+        return 'jsonl'
+    return None
+
+
+def read_rows(lines, format):
+    # (line number, row) pairs from an iterable of text lines. A JSON line that can't be parsed
+    # gives a None row, so the importer can report it and carry on
+    if format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row
+    else:
+        raise ValueError(f'Unknown import format: {format}')
@@ -0,0 +1,31 @@
+# Only the first errors are kept, the rest are counted
+MAX_ERRORS = 100
+
+'''
+ImportReport
+    what an import did so far: rows read, inserted and invalid, with the
+    first MAX_ERRORS errors. The apps subclass it for what only they count
+'''
+class ImportReport:
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.invalid = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'read': self.read,
+            'inserted': self.inserted,
+            'invalid': self.invalid,
+            'errors': self.errors
+        }
+
+    def __str__(self):
+        return f'{self.read} rows read, {self.inserted} inserted, {self.invalid} invalid'
@@ -0,0 +1,9 @@
+from setuptools import setup
+
+setup(
+    name='fsnd-import',
+    version='0.1.0',
+    description='Streaming CSV and JSON lines readers for the bulk imports of the FSND projects',
+    packages=['fsnd_import'],
+    python_requires='>=3.6'
+)
@@ -0,0 +1,73 @@
+#----------------------------------------------------------------------------#
+# Benchmark for the `datetime` template filter.
+#
+# Formats the start times of 10k shows the way /shows renders them, first with
+# the original filter (string from datetime_to_str, re-parsed with dateutil,
+# babel pattern rebuilt on every call), then with format_datetime() on the
+# datetime objects the views now pass, and finally through a Jinja template.
+#
+# Doesn't touch the database:
+#   python benchmarks/bench_datetime_filter.py
+#----------------------------------------------------------------------------#
+
+import os
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import babel.dates
+import dateutil.parser
+from app import create_app, format_datetime
+
+NUM_SHOWS = 10000
+RUNS = 5
+FORMAT = 'full'
+
+
+# The filter and the view helper this benchmark is measured against
+def legacy_datetime_to_str(d):
+  return d.strftime('%Y-%m-%dT%H:%M:%S.%f%Z')
+
+def legacy_format_datetime(value, format='medium'):
+  date = dateutil.parser.parse(value)
+  if format == 'full':
+      format="EEEE MMMM, d, y 'at' h:mma"
+  elif format == 'medium':
+      format="EE MM, dd, y h:mma"
+  return babel.dates.format_datetime(date, format)
+
+
+def measure(label, format_all):
+  timings = []
+  for _ in range(RUNS):
+    start = time.perf_counter()
+    output = format_all()
+    timings.append(time.perf_counter() - start)
+  best = min(timings)
+  print(f'{label:<10} best: {best * 1000:8.1f} ms   per call: {best / NUM_SHOWS * 1e6:7.2f} us')
+  return output
+
+
+def main():
+  rng = random.Random(42)
+  now = datetime.now().replace(microsecond=0)
+  start_times = [now + timedelta(minutes=rng.randint(-60 * 24 * 365, 60 * 24 * 365)) for _ in range(NUM_SHOWS)]
+  # The views used to hand the templates strings
+  start_time_strings = [legacy_datetime_to_str(start_time) for start_time in start_times]
+
+  print(f'Formatting {NUM_SHOWS} show start times with format={FORMAT!r}...')
+  legacy = measure('legacy', lambda: [legacy_format_datetime(value, FORMAT) for value in start_time_strings])
+  current = measure('cached', lambda: [format_datetime(value, FORMAT) for value in start_times])
+  assert legacy == current
+
+  # The same through Jinja, as in templates/pages/shows.html
+  template = create_app().jinja_env.from_string(
+    "{% for start_time in start_times %}<h4>{{ start_time|datetime('full') }}</h4>{% endfor %}")
+  measure('template', lambda: template.render(start_times=start_times))
+
+
+if __name__ == '__main__':
+  main()
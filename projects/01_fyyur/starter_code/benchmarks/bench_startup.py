@@ -0,0 +1,64 @@
+#----------------------------------------------------------------------------#
+# Benchmark for the application start-up.
+#
+# Imports app.py and calls create_app() in a fresh interpreter, RUNS times,
+# and reports the time until the app is ready to serve along with the modules
+# that took the longest to import (from python -X importtime).
+#
+# create_app() doesn't open a database connection, so any DATABASE_URL works:
+#   python benchmarks/bench_startup.py
+#----------------------------------------------------------------------------#
+
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+TOP_MODULES = 15
+
+STARTUP = '''
+import time
+start = time.perf_counter()
+import app
+app.create_app()
+print(time.perf_counter() - start)
+'''
+
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def run_once():
+  result = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+  ready = float(result.stdout.strip().splitlines()[-1])
+
+  modules = []
+  for line in result.stderr.splitlines():
+    match = IMPORTTIME_LINE.match(line)
+    if match:
+      self_us, cumulative_us, indent, name = match.groups()
+      modules.append((name, int(self_us), int(cumulative_us), len(indent)))
+  return ready, modules
+
+
+def main():
+  runs = [run_once() for _ in range(RUNS)]
+  best_ready, modules = min(runs, key=lambda run: run[0])
+
+  # Top-level imports have the smallest indentation; their cumulative times add up to the total
+  top_level = min(indent for _, _, _, indent in modules)
+  total_import = sum(cumulative for _, _, cumulative, indent in modules if indent == top_level)
+
+  print(f'time to ready (best of {RUNS}): {best_ready * 1000:8.1f} ms')
+  print(f'total import time:          {total_import / 1000:8.1f} ms   modules: {len(modules)}')
+  print()
+  print(f'{"module":<45} {"self ms":>9} {"cumulative ms":>14}')
+  for name, self_us, cumulative_us, _ in sorted(modules, key=lambda module: -module[2])[:TOP_MODULES]:
+    print(f'{name:<45} {self_us / 1000:9.1f} {cumulative_us / 1000:14.1f}')
+
+
+if __name__ == '__main__':
+  main()
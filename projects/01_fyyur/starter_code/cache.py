@@ -0,0 +1,153 @@
+#----------------------------------------------------------------------------#
+# Read-through cache for page data.
+#
+# Entries live in a namespace (e.g. 'venues') and expire after a TTL.
+# Invalidating a namespace bumps its version, which orphans every entry
+# stored under the previous version at once (the /shows pages are keyed by
+# cursor, so they can't be listed and deleted one by one). A value is stored
+# under the key looked up before it was built: when a write invalidates the
+# namespace meanwhile, the value lands under the old version instead of
+# being served as current.
+#
+# Backends:
+#   MemoryBackend - in-process, LRU eviction once max_entries is reached
+#   RedisBackend  - any client speaking the Redis get/set/incr commands
+#                   (redis.Redis, or a local fake in tests); eviction is left
+#                   to the server's maxmemory-policy
+#----------------------------------------------------------------------------#
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend(object):
+
+  def __init__(self, max_entries=500):
+    self.max_entries = max_entries
+    self.entries = OrderedDict()
+    # Namespace versions are kept apart so that they are never evicted
+    self.versions = {}
+    self.evictions = 0
+    self.lock = threading.Lock()
+
+  def get(self, key):
+    with self.lock:
+      entry = self.entries.get(key)
+      if entry is None:
+        return None
+      value, expires_at = entry
+      if expires_at is not None and expires_at <= time.monotonic():
+        del self.entries[key]
+        return None
+      self.entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, timeout):
+    expires_at = time.monotonic() + timeout if timeout else None
+    with self.lock:
+      self.entries[key] = (value, expires_at)
+      self.entries.move_to_end(key)
+      while len(self.entries) > self.max_entries:
+        self.entries.popitem(last=False)
+        self.evictions += 1
+
+  def version(self, namespace):
+    return self.versions.get(namespace, 0)
+
+  def bump_version(self, namespace):
+    with self.lock:
+      self.versions[namespace] = self.versions.get(namespace, 0) + 1
+
+  def size(self):
+    return len(self.entries)
+
+
+class RedisBackend(object):
+
+  def __init__(self, client, prefix='fyyur:'):
+    self.client = client
+    self.prefix = prefix
+    # Evictions happen on the server and aren't visible from here
+    self.evictions = None
+
+  def get(self, key):
+    value = self.client.get(self.prefix + key)
+    return pickle.loads(value) if value is not None else None
+
+  def set(self, key, value, timeout):
+    self.client.set(self.prefix + key, pickle.dumps(value), ex=timeout or None)
+
+  def version(self, namespace):
+    return int(self.client.get(self.prefix + 'version:' + namespace) or 0)
+
+  def bump_version(self, namespace):
+    self.client.incr(self.prefix + 'version:' + namespace)
+
+  def size(self):
+    return None
+
+
+class PageCache(object):
+
+  def __init__(self, backend, default_timeout=60):
+    self.backend = backend
+    self.default_timeout = default_timeout
+    self.hits = 0
+    self.misses = 0
+    self.invalidations = 0
+
+  @classmethod
+  def from_config(cls, config):
+    # CACHE_TYPE is 'memory' (default) or 'redis'
+    if config.get('CACHE_TYPE', 'memory') == 'redis':
+      import redis
+      backend = RedisBackend(redis.Redis.from_url(config['CACHE_REDIS_URL']))
+    else:
+      backend = MemoryBackend(config.get('CACHE_MAX_ENTRIES', 500))
+    return cls(backend, config.get('CACHE_DEFAULT_TIMEOUT', 60))
+
+  def make_key(self, namespace, key):
+    return f'{namespace}:{self.backend.version(namespace)}:{key}'
+
+  def lookup(self, namespace, key=''):
+    # (value or None, the cache key to store a value built after this lookup under)
+    cache_key = self.make_key(namespace, key)
+    value = self.backend.get(cache_key)
+    if value is None:
+      self.misses += 1
+    else:
+      self.hits += 1
+    return value, cache_key
+
+  def store(self, cache_key, value, timeout=None):
+    self.backend.set(cache_key, value, timeout or self.default_timeout)
+
+  def get(self, namespace, key=''):
+    return self.lookup(namespace, key)[0]
+
+  def set(self, namespace, key, value, timeout=None):
+    self.store(self.make_key(namespace, key), value, timeout)
+
+  def get_or_set(self, namespace, key, build, timeout=None):
+    value, cache_key = self.lookup(namespace, key)
+    if value is None:
+      value = build()
+      self.store(cache_key, value, timeout)
+    return value
+
+  def invalidate(self, *namespaces):
+    for namespace in namespaces:
+      self.backend.bump_version(namespace)
+      self.invalidations += 1
+
+  def stats(self):
+    return {
+      'backend': type(self.backend).__name__,
+      'hits': self.hits,
+      'misses': self.misses,
+      'evictions': self.backend.evictions,
+      'invalidations': self.invalidations,
+      'entries': self.backend.size()
+    }
@@ -0,0 +1,53 @@
+#----------------------------------------------------------------------------#
+# Process-wide registry of the genres table.
+#
+# The genres are a fixed list seeded once, so they are read a single time and
+# kept as name <-> id maps instead of being looked up on every create.
+#----------------------------------------------------------------------------#
+
+import threading
+
+
+class UnknownGenreError(Exception):
+  pass
+
+
+class GenreRegistry(object):
+
+  def __init__(self, db, genre_model):
+    self.db = db
+    self.genre_model = genre_model
+    self.ids_by_name = None
+    self.names_by_id = None
+    self.lock = threading.Lock()
+
+  def refresh(self):
+    rows = self.db.session.query(self.genre_model.id, self.genre_model.name).all()
+    with self.lock:
+      self.ids_by_name = {name: genre_id for genre_id, name in rows}
+      self.names_by_id = {genre_id: name for genre_id, name in rows}
+
+  def ensure_loaded(self):
+    if self.ids_by_name is None:
+      self.refresh()
+
+  def ids_for(self, names):
+    # Ids of the given genre names, without duplicates, in the same order
+    self.ensure_loaded()
+    names = list(dict.fromkeys(names))
+    missing = [name for name in names if name not in self.ids_by_name]
+    if missing:
+      # The table may have changed since it was loaded
+      self.refresh()
+      missing = [name for name in names if name not in self.ids_by_name]
+      if missing:
+        raise UnknownGenreError('Unknown genre(s): ' + ', '.join(missing))
+    return [self.ids_by_name[name] for name in names]
+
+  def name_for(self, genre_id):
+    self.ensure_loaded()
+    return self.names_by_id[genre_id]
+
+  def link_rows(self, owner_column, owner_id, names):
+    # Rows for a single bulk insert into venues_genres / artists_genres
+    return [{owner_column: owner_id, 'genre_id': genre_id} for genre_id in self.ids_for(names)]
@@ -0,0 +1,58 @@
+"""Seed the genres table
+
+Revision ID: 5a7c1e9d2b64
+Revises: d3b2a8c4e5f1
+Create Date: 2026-10-18 11:02:47.581932
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7c1e9d2b64'
+down_revision = 'd3b2a8c4e5f1'
+branch_labels = None
+depends_on = None
+
+# Same list as models.GENRES; copied so the migration doesn't depend on the application code
+GENRES = [
+    (1, 'Alternative'),
+    (2, 'Blues'),
+    (3, 'Classical'),
+    (4, 'Country'),
+    (5, 'Electronic'),
+    (6, 'Folk'),
+    (7, 'Funk'),
+    (8, 'Hip-Hop'),
+    (9, 'Heavy Metal'),
+    (10, 'Instrumental'),
+    (11, 'Jazz'),
+    (12, 'Musical Theatre'),
+    (13, 'Pop'),
+    (14, 'Punk'),
+    (15, 'R&B'),
+    (16, 'Reggae'),
+    (17, 'Rock n Roll'),
+    (18, 'Soul'),
+    (19, 'Other'),
+]
+
+
+def upgrade():
+    # The app used to seed this table when it was imported, so some databases
+    # already have these rows: only the missing ones are inserted
+    genres = sa.table('genres', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    connection = op.get_bind()
+    existing = {genre_id for genre_id, in connection.execute(sa.select([genres.c.id]))}
+    missing = [{'id': genre_id, 'name': name} for genre_id, name in GENRES if genre_id not in existing]
+    if missing:
+        op.bulk_insert(genres, missing)
+
+    # Rows were inserted with explicit ids, so move the sequence past them
+    op.execute("SELECT setval('genres_id_seq', (SELECT max(id) FROM genres))")
+
+
+def downgrade():
+    # Genres may be referenced by venues and artists by now, so they are left in place
+    pass
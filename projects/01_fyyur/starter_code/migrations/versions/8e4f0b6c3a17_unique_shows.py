@@ -0,0 +1,34 @@
+"""Unique (artist, venue, start time) for shows
+
+Revision ID: 8e4f0b6c3a17
+Revises: 5a7c1e9d2b64
+Create Date: 2026-10-18 12:20:05.117342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4f0b6c3a17'
+down_revision = '5a7c1e9d2b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The duplicate check of /shows/create wasn't transactional, so keep the
+    # oldest of any identical shows before adding the constraint
+    op.execute("""
+        DELETE FROM shows a
+        USING shows b
+        WHERE a.artist_id = b.artist_id
+            AND a.venue_id = b.venue_id
+            AND a.start_time = b.start_time
+            AND a.id > b.id
+    """)
+    op.create_unique_constraint('uq_shows_artist_venue_start_time', 'shows', ['artist_id', 'venue_id', 'start_time'])
+
+
+def downgrade():
+    op.drop_constraint('uq_shows_artist_venue_start_time', 'shows', type_='unique')
@@ -0,0 +1,50 @@
+"""Indexes for the venue, artist and show lookups
+
+Revision ID: c61d9e2f47a3
+Revises: 8e4f0b6c3a17
+Create Date: 2026-10-18 13:05:44.902871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c61d9e2f47a3'
+down_revision = '8e4f0b6c3a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /venues/create refuses a second venue at the same address, but nothing
+    # stopped an edit from creating one: make sure there is none left
+    connection = op.get_bind()
+    duplicates = connection.execute(sa.text("""
+        SELECT state, city, address, count(*) FROM venues
+        GROUP BY state, city, address
+        HAVING count(*) > 1
+        LIMIT 10
+    """)).fetchall()
+    if duplicates:
+        raise RuntimeError(
+            'Several venues share an address, merge them before upgrading: ' +
+            '; '.join(f'{address}, {city}, {state} ({count} venues)' for state, city, address, count in duplicates))
+
+    # Duplicate check of /venues/create, and the (state, city) grouping of /venues
+    op.create_unique_constraint('uq_venues_state_city_address', 'venues', ['state', 'city', 'address'])
+    # Duplicate check of /artists/create
+    op.create_index('ix_artists_name_state_city', 'artists', ['name', 'state', 'city'])
+    # /shows, in (start_time, id) order
+    op.create_index('ix_shows_start_time_id', 'shows', ['start_time', 'id'])
+    # Past / upcoming shows of a venue or an artist
+    op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'])
+    op.create_index('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time'])
+
+
+def downgrade():
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_start_time_id', table_name='shows')
+    op.drop_index('ix_artists_name_state_city', table_name='artists')
+    op.drop_constraint('uq_venues_state_city_address', 'venues', type_='unique')
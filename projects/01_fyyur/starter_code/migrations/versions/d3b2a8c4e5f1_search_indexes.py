@@ -0,0 +1,100 @@
+"""Search indexes for venues and artists
+
+Revision ID: d3b2a8c4e5f1
+Revises: 0f325dcbab22
+Create Date: 2026-10-18 10:12:31.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3b2a8c4e5f1'
+down_revision = '0f325dcbab22'
+branch_labels = None
+depends_on = None
+
+# (table, association table, foreign key in the association table)
+SEARCHABLE = [
+    ('venues', 'venues_genres', 'venue_id'),
+    ('artists', 'artists_genres', 'artist_id'),
+]
+
+
+def upgrade():
+    # Trigram indexes let the partial name matching (ILIKE '%term%') use an index
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for table, link_table, link_column in SEARCHABLE:
+        op.add_column(table, sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+        # Name (A), city (B) and genre names (C) of a row, as a single document
+        op.execute(f"""
+            CREATE FUNCTION {table}_search_vector(row_id integer, row_name varchar, row_city varchar)
+            RETURNS tsvector AS $$
+                SELECT setweight(to_tsvector('simple', coalesce(row_name, '')), 'A')
+                    || setweight(to_tsvector('simple', coalesce(row_city, '')), 'B')
+                    || setweight(to_tsvector('simple', coalesce((
+                        SELECT string_agg(genres.name, ' ')
+                        FROM {link_table} JOIN genres ON genres.id = {link_table}.genre_id
+                        WHERE {link_table}.{link_column} = row_id
+                    ), '')), 'C')
+            $$ LANGUAGE sql STABLE
+        """)
+
+        # Keep the vector up to date when the row itself changes...
+        op.execute(f"""
+            CREATE FUNCTION {table}_search_vector_trigger() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {table}_search_vector(NEW.id, NEW.name, NEW.city);
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_search_vector_update
+            BEFORE INSERT OR UPDATE OF name, city ON {table}
+            FOR EACH ROW EXECUTE PROCEDURE {table}_search_vector_trigger()
+        """)
+
+        # ...and when genres are added to or removed from it
+        op.execute(f"""
+            CREATE FUNCTION {link_table}_search_vector_trigger() RETURNS trigger AS $$
+            DECLARE
+                changed_id integer;
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    changed_id := OLD.{link_column};
+                ELSE
+                    changed_id := NEW.{link_column};
+                END IF;
+                UPDATE {table} SET search_vector = {table}_search_vector(id, name, city) WHERE id = changed_id;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {link_table}_search_vector_update
+            AFTER INSERT OR DELETE ON {link_table}
+            FOR EACH ROW EXECUTE PROCEDURE {link_table}_search_vector_trigger()
+        """)
+
+        # Backfill the existing rows
+        op.execute(f'UPDATE {table} SET search_vector = {table}_search_vector(id, name, city)')
+
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], postgresql_using='gin')
+        op.execute(f'CREATE INDEX ix_{table}_name_trgm ON {table} USING gin (name gin_trgm_ops)')
+
+
+def downgrade():
+    for table, link_table, link_column in reversed(SEARCHABLE):
+        op.drop_index(f'ix_{table}_name_trgm', table_name=table)
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.execute(f'DROP TRIGGER {link_table}_search_vector_update ON {link_table}')
+        op.execute(f'DROP FUNCTION {link_table}_search_vector_trigger()')
+        op.execute(f'DROP TRIGGER {table}_search_vector_update ON {table}')
+        op.execute(f'DROP FUNCTION {table}_search_vector_trigger()')
+        op.execute(f'DROP FUNCTION {table}_search_vector(integer, varchar, varchar)')
+        op.drop_column(table, 'search_vector')
@@ -0,0 +1,144 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from flask_sqlalchemy import SQLAlchemy
+
+# Bound to the application in create_app() (see app.py)
+db = SQLAlchemy()
+
+#----------------------------------------------------------------------------#
+# Relationship tables
+#----------------------------------------------------------------------------#
+# Relationship table between venues and genres
+venues_genres = db.Table('venues_genres',
+db.Column('venue_id', db.Integer, db.ForeignKey('venues.id'), primary_key=True),
+db.Column('genre_id', db.Integer, db.ForeignKey('genres.id'), primary_key=True)
+)
+
+# Relationship table between artists and genres
+artists_genres = db.Table('artists_genres',
+db.Column('artist_id', db.Integer, db.ForeignKey('artists.id'), primary_key=True),
+db.Column('genre_id', db.Integer, db.ForeignKey('genres.id'), primary_key=True)
+)
+
+#----------------------------------------------------------------------------#
+# Models.
+#----------------------------------------------------------------------------#
+
+class Venue(db.Model):
+  __tablename__ = 'venues'
+  # Indexes and constraints added by the c61d9e2f47a3 migration
+  __table_args__ = (
+    db.UniqueConstraint('state', 'city', 'address', name='uq_venues_state_city_address'),
+  )
+
+  id = db.Column(db.Integer, primary_key=True)
+  name = db.Column(db.String)
+  city = db.Column(db.String(120))
+  state = db.Column(db.String(120))
+  address = db.Column(db.String(120))
+  phone = db.Column(db.String(120))
+  image_link = db.Column(db.String(500))
+  facebook_link = db.Column(db.String(120))
+
+  # DONE: implement any missing fields, as a database migration using Flask-Migrate
+  website = db.Column(db.String(120))
+  seeking_talent = db.Column(db.Boolean)
+  seeking_description = db.Column(db.String(500))
+  # Relationships
+  shows = db.relationship('Show', backref='venue', lazy=True)
+  genres = db.relationship('Genre', secondary=venues_genres, backref=db.backref('venues', lazy=True))
+
+  def __repr__(self):
+    return f'<Venue {self.id}: {self.name}>'
+
+class Artist(db.Model):
+  __tablename__ = 'artists'
+  __table_args__ = (
+    db.Index('ix_artists_name_state_city', 'name', 'state', 'city'),
+  )
+
+  id = db.Column(db.Integer, primary_key=True)
+  name = db.Column(db.String)
+  city = db.Column(db.String(120))
+  state = db.Column(db.String(120))
+  phone = db.Column(db.String(120))
+  genres = db.Column(db.String(120))
+  image_link = db.Column(db.String(500))
+  facebook_link = db.Column(db.String(120))
+
+  # DONE: implement any missing fields, as a database migration using Flask-Migrate
+  website = db.Column(db.String(120))
+  seeking_venue = db.Column(db.Boolean)
+  seeking_description = db.Column(db.String(500))
+  # Relationships
+  genres = db.relationship('Genre', secondary=artists_genres, backref=db.backref('artists', lazy=True))
+  shows = db.relationship('Show', backref='artist', lazy=True)
+
+  def __repr__(self):
+    return f'<Artist {self.id}: {self.name}>'
+
+# DONE: Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+
+# Values for this table are added by the 5a7c1e9d2b64 migration, or by `flask seed-genres`
+class Genre(db.Model):
+  __tablename__ = 'genres'
+  id = db.Column(db.Integer, primary_key=True)
+  name = db.Column(db.String())
+
+class Show(db.Model):
+  __tablename__ = 'shows'
+  __table_args__ = (
+    # Also lets the bulk import skip shows that already exist (see show_import.py)
+    db.UniqueConstraint('artist_id', 'venue_id', 'start_time', name='uq_shows_artist_venue_start_time'),
+    db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+    db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+  )
+  id = db.Column(db.Integer, primary_key=True)
+  start_time = db.Column(db.DateTime)
+  artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=False)
+  venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False)
+
+  def __repr__(self):
+    return f'<Show {self.id}. Venue: {self.venue_id}, artist: {self.artist_id}. Start time: {self.start_time}>'
+
+#----------------------------------------------------------------------------#
+# Seed data.
+#----------------------------------------------------------------------------#
+
+# Also inserted by the 5a7c1e9d2b64 migration
+GENRES = [
+  {'id': 1, 'name': 'Alternative'},
+  {'id': 2, 'name': 'Blues'},
+  {'id': 3, 'name': 'Classical'},
+  {'id': 4, 'name': 'Country'},
+  {'id': 5, 'name': 'Electronic'},
+  {'id': 6, 'name': 'Folk'},
+  {'id': 7, 'name': 'Funk'},
+  {'id': 8, 'name': 'Hip-Hop'},
+  {'id': 9, 'name': 'Heavy Metal'},
+  {'id': 10, 'name': 'Instrumental'},
+  {'id': 11, 'name': 'Jazz'},
+  {'id': 12, 'name': 'Musical Theatre'},
+  {'id': 13, 'name': 'Pop'},
+  {'id': 14, 'name': 'Punk'},
+  {'id': 15, 'name': 'R&B'},
+  {'id': 16, 'name': 'Reggae'},
+  {'id': 17, 'name': 'Rock n Roll'},
+  {'id': 18, 'name': 'Soul'},
+  {'id': 19, 'name': 'Other'}
+]
+
+def seed_genres():
+  # Inserts the genres that are missing, so it can safely run more than once. Returns how many were added
+  existing = {genre_id for genre_id, in db.session.query(Genre.id)}
+  missing = [genre for genre in GENRES if genre['id'] not in existing]
+  if missing:
+    db.session.execute(Genre.__table__.insert(), missing)
+    if db.session.get_bind().dialect.name == 'postgresql':
+      # Rows were inserted with explicit ids, so move the sequence past them, as the migration does
+      db.session.execute("SELECT setval('genres_id_seq', (SELECT max(id) FROM genres))")
+    db.session.commit()
+  return len(missing)
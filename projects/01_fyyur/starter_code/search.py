@@ -0,0 +1,209 @@
+#----------------------------------------------------------------------------#
+# Search for venues and artists.
+#
+# On PostgreSQL the search runs against the `search_vector` column and the
+# trigram index added by the d3b2a8c4e5f1 migration: matches are ranked with
+# ts_rank plus trigram similarity, and the number of upcoming shows comes back
+# in the same query. Other databases (e.g. SQLite while testing) use a pure
+# Python inverted index built from the same fields, plus an index of the
+# n-grams of the names for the partial name matches, so a search doesn't
+# scan every name.
+#----------------------------------------------------------------------------#
+
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+ID_CHUNK_SIZE = 500
+# Names are indexed by their substrings of up to NGRAM_SIZE characters
+NGRAM_SIZE = 3
+
+# Relative weight of a match in each field, mirroring the A/B/C weights of the search_vector
+FIELD_WEIGHTS = {
+  'name': 1.0,
+  'city': 0.4,
+  'genres': 0.2
+}
+
+
+def tokenize(text):
+  if not text:
+    return []
+  return TOKEN_PATTERN.findall(text.lower())
+
+
+def prefix_tsquery(tokens):
+  # "the mus" -> "the:* & mus:*". Tokens only contain word characters, so they can't inject tsquery operators
+  return ' & '.join(token + ':*' for token in tokens)
+
+
+class InMemorySearchIndex(object):
+  # Inverted index of token -> {doc_id: weight}, with a sorted token list for prefix lookups,
+  # and of name n-gram -> {doc_id} for the partial name matches
+
+  def __init__(self):
+    self.postings = defaultdict(dict)
+    self.names = {}
+    self.ngrams = defaultdict(set)
+    self.sorted_tokens = None
+
+  def add(self, doc_id, name, city=None, genres=()):
+    # Each doc_id is added once: ModelSearch builds a new index after writes
+    name = (name or '').lower()
+    self.names[doc_id] = name
+    for size in range(1, NGRAM_SIZE + 1):
+      for start in range(len(name) - size + 1):
+        self.ngrams[name[start:start + size]].add(doc_id)
+    fields = {
+      'name': tokenize(name),
+      'city': tokenize(city),
+      'genres': [token for genre in genres for token in tokenize(genre)]
+    }
+    for field, tokens in fields.items():
+      for token in tokens:
+        postings = self.postings[token]
+        postings[doc_id] = postings.get(doc_id, 0) + FIELD_WEIGHTS[field]
+    self.sorted_tokens = None
+
+  def prefix_matches(self, prefix):
+    # Union of the postings of every indexed token starting with prefix
+    if self.sorted_tokens is None:
+      self.sorted_tokens = sorted(self.postings)
+    matches = {}
+    position = bisect_left(self.sorted_tokens, prefix)
+    while position < len(self.sorted_tokens) and self.sorted_tokens[position].startswith(prefix):
+      for doc_id, weight in self.postings[self.sorted_tokens[position]].items():
+        matches[doc_id] = matches.get(doc_id, 0) + weight
+      position += 1
+    return matches
+
+  def name_matches(self, term):
+    # Docs whose lowercase name contains term: the docs having every n-gram of term, checked
+    # against the name when term is longer than an n-gram
+    if not term:
+      return self.names.keys()
+    if len(term) <= NGRAM_SIZE:
+      return self.ngrams.get(term, ())
+    candidates = sorted((self.ngrams.get(term[start:start + NGRAM_SIZE], set())
+                         for start in range(len(term) - NGRAM_SIZE + 1)), key=len)
+    return [doc_id for doc_id in candidates[0].intersection(*candidates[1:]) if term in self.names[doc_id]]
+
+  def search(self, term):
+    # Returns [(doc_id, score)], best matches first
+    term = (term or '').lower()
+    scores = None
+    for token in tokenize(term):
+      matches = self.prefix_matches(token)
+      if scores is None:
+        scores = matches
+      else:
+        scores = {doc_id: score + matches[doc_id] for doc_id, score in scores.items() if doc_id in matches}
+
+    scores = scores or {}
+    # Keep the partial, case-insensitive name matching the search pages always had
+    for doc_id in self.name_matches(term):
+      scores[doc_id] = scores.get(doc_id, 0) + FIELD_WEIGHTS['name']
+
+    return sorted(scores.items(), key=lambda item: (-item[1], self.names[item[0]], item[0]))
+
+
+class ModelSearch(object):
+  # Search over one model (Venue or Artist): name, city and the names of its genres
+
+  def __init__(self, db, model, genre_model, genre_link, show_column):
+    self.db = db
+    self.model = model
+    self.genre_model = genre_model
+    # Column of the association table pointing to the model, e.g. venues_genres.c.venue_id
+    self.genre_link = genre_link
+    # Column of shows pointing to the model, e.g. Show.venue_id
+    self.show_column = show_column
+    self.show_model = show_column.class_
+    self.index = None
+
+  def uses_postgres(self):
+    return self.db.engine.dialect.name == 'postgresql'
+
+  def invalidate(self):
+    # Called after writes, so the in-memory index is rebuilt by the next search
+    self.index = None
+
+  def upcoming_shows_join(self, current_time):
+    return self.db.and_(self.show_column == self.model.id, self.show_model.start_time >= current_time)
+
+  def search(self, term, current_time=None):
+    if current_time is None:
+      current_time = datetime.now()
+    if self.uses_postgres():
+      return self.search_postgres(term, current_time)
+    return self.search_in_memory(term, current_time)
+
+  def search_postgres(self, term, current_time):
+    db = self.db
+    model = self.model
+    tokens = tokenize(term)
+    name_matches = model.name.ilike('%' + term + '%')
+    num_upcoming_shows = db.func.count(self.show_model.id)
+
+    query = db.session.query(model.id, model.name, num_upcoming_shows) \
+      .outerjoin(self.show_model, self.upcoming_shows_join(current_time)) \
+      .group_by(model.id)
+
+    if tokens:
+      search_vector = db.literal_column(model.__tablename__ + '.search_vector')
+      tsquery = db.func.to_tsquery('simple', prefix_tsquery(tokens))
+      rank = db.func.ts_rank(search_vector, tsquery) + db.func.similarity(model.name, term)
+      query = query.filter(db.or_(search_vector.op('@@')(tsquery), name_matches)) \
+        .order_by(rank.desc(), model.name, model.id)
+    else:
+      query = query.filter(name_matches).order_by(model.name, model.id)
+
+    return [{
+      'id': doc_id,
+      'name': name,
+      'num_upcoming_shows': num_shows
+    } for doc_id, name, num_shows in query.all()]
+
+  def build_index(self):
+    db = self.db
+    model = self.model
+    genres = defaultdict(list)
+    rows = db.session.query(self.genre_link, self.genre_model.name) \
+      .select_from(self.genre_link.table) \
+      .join(self.genre_model, self.genre_model.id == self.genre_link.table.c.genre_id)
+    for doc_id, genre in rows:
+      genres[doc_id].append(genre)
+
+    index = InMemorySearchIndex()
+    for doc_id, name, city in db.session.query(model.id, model.name, model.city):
+      index.add(doc_id, name, city, genres[doc_id])
+    return index
+
+  def search_in_memory(self, term, current_time):
+    if self.index is None:
+      self.index = self.build_index()
+
+    ranked = self.index.search(term)
+    if not ranked:
+      return []
+
+    ids = [doc_id for doc_id, _ in ranked]
+    model = self.model
+    num_upcoming_shows = self.db.func.count(self.show_model.id)
+    by_id = {}
+    # Chunked to stay below SQLite's limit on bound parameters
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+      rows = self.db.session.query(model.id, model.name, num_upcoming_shows) \
+        .outerjoin(self.show_model, self.upcoming_shows_join(current_time)) \
+        .filter(model.id.in_(ids[start:start + ID_CHUNK_SIZE])) \
+        .group_by(model.id)
+      for doc_id, name, num_shows in rows:
+        by_id[doc_id] = (name, num_shows)
+
+    return [{
+      'id': doc_id,
+      'name': by_id[doc_id][0],
+      'num_upcoming_shows': by_id[doc_id][1]
+    } for doc_id in ids if doc_id in by_id]
@@ -0,0 +1,132 @@
+#----------------------------------------------------------------------------#
+# Bulk import of shows from CSV or JSON lines.
+#
+# Each row needs artist_id, venue_id and start_time (ISO 8601, e.g.
+# 2035-04-01T20:00:00). The input is read one row at a time, so a whole
+# season can be streamed in without being held in memory:
+#
+#   - artist and venue ids are checked against the ids loaded once up front,
+#     instead of one query per row
+#   - valid rows are inserted in batches of multi-row INSERTs, each batch in
+#     its own transaction
+#   - rows that already exist are skipped by the database, through the
+#     uq_shows_artist_venue_start_time constraint (ON CONFLICT DO NOTHING on
+#     PostgreSQL, INSERT OR IGNORE on SQLite), so an interrupted import can
+#     simply be run again
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+from fsnd_import import FORMATS, ImportReport, format_for_filename, format_for_mimetype, read_rows
+
+FIELDS = ('artist_id', 'venue_id', 'start_time')
+BATCH_SIZE = 5000
+# SQLite limits the number of parameters of a single statement (999 before 3.32)
+SQLITE_ROWS_PER_STATEMENT = 300
+
+
+class ShowImportReport(ImportReport):
+  # Also counts the rows skipped because the show already exists
+
+  def __init__(self):
+    super().__init__()
+    self.duplicates = 0
+
+  def as_dict(self):
+    return dict(super().as_dict(), duplicates=self.duplicates)
+
+  def __str__(self):
+    return (f'{self.read} rows read, {self.inserted} inserted, {self.duplicates} duplicates, '
+            f'{self.invalid} invalid')
+
+
+def parse_start_time(value):
+  if isinstance(value, str) and value.endswith('Z'):
+    value = value[:-1]
+  start_time = datetime.fromisoformat(value)
+  if start_time.tzinfo is not None:
+    raise ValueError('start_time must not have a UTC offset')
+  return start_time
+
+
+class ShowImporter(object):
+
+  def __init__(self, db, venue_model, artist_model, show_model, batch_size=BATCH_SIZE, on_progress=None):
+    self.db = db
+    self.venue_model = venue_model
+    self.artist_model = artist_model
+    self.table = show_model.__table__
+    self.batch_size = batch_size
+    # Called with the report after every batch
+    self.on_progress = on_progress
+    self.venue_ids = None
+    self.artist_ids = None
+    # Report of the last run, also when it raised: the batches before the error stay committed
+    self.report = None
+
+  def load_ids(self):
+    self.venue_ids = {venue_id for venue_id, in self.db.session.query(self.venue_model.id)}
+    self.artist_ids = {artist_id for artist_id, in self.db.session.query(self.artist_model.id)}
+
+  def parse_row(self, row):
+    # Validated row ready to insert; raises ValueError with the reason otherwise
+    if not isinstance(row, dict):
+      raise ValueError('Not a valid row')
+    missing = [field for field in FIELDS if row.get(field) in (None, '')]
+    if missing:
+      raise ValueError('Missing ' + ', '.join(missing))
+    try:
+      artist_id = int(row['artist_id'])
+      venue_id = int(row['venue_id'])
+    except (TypeError, ValueError):
+      raise ValueError('Artist ID and venue ID must be integers')
+    try:
+      start_time = parse_start_time(row['start_time'])
+    except (TypeError, ValueError):
+      raise ValueError('Invalid start time')
+    if artist_id not in self.artist_ids:
+      raise ValueError(f'Unknown artist {artist_id}')
+    if venue_id not in self.venue_ids:
+      raise ValueError(f'Unknown venue {venue_id}')
+    return {'artist_id': artist_id, 'venue_id': venue_id, 'start_time': start_time}
+
+  def insert_statements(self, rows):
+    dialect = self.db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+      from sqlalchemy.dialects.postgresql import insert
+      yield insert(self.table).values(rows).on_conflict_do_nothing(constraint='uq_shows_artist_venue_start_time')
+    elif dialect == 'sqlite':
+      for start in range(0, len(rows), SQLITE_ROWS_PER_STATEMENT):
+        yield self.table.insert().prefix_with('OR IGNORE').values(rows[start:start + SQLITE_ROWS_PER_STATEMENT])
+    else:
+      raise ValueError(f'Bulk import is not supported on {dialect}')
+
+  def insert_batch(self, rows, report):
+    inserted = 0
+    for statement in self.insert_statements(rows):
+      inserted += self.db.session.execute(statement).rowcount
+    self.db.session.commit()
+    report.inserted += inserted
+    report.duplicates += len(rows) - inserted
+    if self.on_progress is not None:
+      self.on_progress(report)
+
+  def run(self, lines, format):
+    # Imports the rows of an iterable of text lines (an open file, a request stream...)
+    report = self.report = ShowImportReport()
+    if self.venue_ids is None:
+      self.load_ids()
+
+    batch = []
+    for line_number, row in read_rows(lines, format):
+      report.read += 1
+      try:
+        batch.append(self.parse_row(row))
+      except ValueError as e:
+        report.add_error(line_number, str(e))
+        continue
+      if len(batch) == self.batch_size:
+        self.insert_batch(batch, report)
+        batch = []
+    if batch:
+      self.insert_batch(batch, report)
+    return report
@@ -0,0 +1,79 @@
+# Benchmark of the JSON serialization and compression of 100-question pages.
+#
+# Times flask.jsonify against flaskr/serialization.py (stdlib and, when the
+# orjson package is installed, orjson), then the size of a page and the time
+# to compress it with gzip and, when the brotli package is installed, brotli
+# (flaskr/compression.py). Needs no database: the pages are generated.
+#
+#   python benchmarks/bench_serialization.py
+
+import os
+import sys
+import gzip
+import random
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flask
+from flaskr import serialization
+from flaskr.compression import Compressor, brotli
+
+PAGE_SIZE = 100
+RUNS = 2000
+WORDS = ('what', 'which', 'who', 'country', 'year', 'first', 'largest', 'world', 'known', 'name', 'team',
+         'river', 'painter', 'element', 'the', 'of', 'in', 'is', 'was', 'by', 'a', 'for', 'title', 'born')
+
+
+def page(rng):
+  categories = {str(i): name for i, name in enumerate(('Science', 'Art', 'Geography', 'History', 'Entertainment', 'Sports'), 1)}
+  questions = [{
+    'id': 1000 + i,
+    'question': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + '?',
+    'answer': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).title(),
+    'category': rng.randint(1, 6),
+    'difficulty': rng.randint(1, 5)
+  } for i in range(PAGE_SIZE)]
+  return {
+    'success': True,
+    'questions': questions,
+    'total_questions': 100000,
+    'categories': categories,
+    'current_category': None
+  }
+
+
+def per_call(run):
+  return min(timeit.repeat(run, number=RUNS, repeat=3)) / RUNS
+
+
+def main():
+  app = flask.Flask(__name__)
+  data = page(random.Random(42))
+
+  with app.app_context():
+    legacy = per_call(lambda: flask.jsonify(data))
+    print(f'{"flask.jsonify":<24} {legacy * 1e6:8.1f} us')
+    providers = [serialization.StdlibProvider()]
+    if serialization.orjson is not None:
+      providers.append(serialization.OrjsonProvider())
+    for provider in providers:
+      app.extensions['json_provider'] = provider
+      timing = per_call(lambda: serialization.jsonify(data))
+      print(f'{"jsonify, " + provider.name:<24} {timing * 1e6:8.1f} us   x{legacy / timing:.1f}')
+
+    body = serialization.jsonify(data).get_data()
+
+  compressor = Compressor()
+  print(f'\n{"identity":<24} {len(body):8} bytes')
+  encoders = [(f'gzip, level {compressor.level}', lambda: gzip.compress(body, compresslevel=compressor.level))]
+  if brotli is not None:
+    encoders.append((f'brotli, quality {compressor.brotli_quality}', lambda: brotli.compress(body, quality=compressor.brotli_quality)))
+  for label, compress in encoders:
+    size = len(compress())
+    timing = per_call(compress)
+    print(f'{label:<24} {size:8} bytes   {len(body) / size:4.1f}x smaller   {timing * 1e6:8.1f} us')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,94 @@
+import os
+import re
+import shutil
+
+import pytest
+
+from flaskr import create_app
+from models import db
+
+TRIVIA_DUMP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trivia.psql')
+COPY_ESCAPE = re.compile(r'\\(.)')
+COPY_ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r'}
+
+'''
+pytest harness
+    runs test_flaskr.py without PostgreSQL: every pytest worker (one, or
+    one per CPU with `pytest -n auto`) gets its own SQLite database, loaded
+    once with the rows of trivia.psql, and an app shared by its tests.
+    Before each test the database file is restored from a pristine copy and
+    the caches of the app are cleared, so the tests can run in any order
+    and on any worker.
+'''
+
+def unescape(value):
+  # \t, \n, \r and \\ in the text format of COPY
+  return COPY_ESCAPE.sub(lambda match: COPY_ESCAPES.get(match.group(1), match.group(1)), value)
+
+
+def read_copy_blocks(path):
+  # {table: (columns, rows)} from the COPY ... FROM stdin blocks of a pg_dump
+  tables = {}
+  with open(path, encoding='utf-8') as dump:
+    lines = iter(dump)
+    for line in lines:
+      if not line.startswith('COPY '):
+        continue
+      # COPY public.questions (id, question, answer, difficulty, category) FROM stdin;
+      table = line.split()[1].split('.')[-1]
+      columns = [column.strip() for column in line[line.index('(') + 1:line.index(')')].split(',')]
+      rows = []
+      for row in lines:
+        if row.rstrip('\n') == '\\.':
+          break
+        values = [None if value == '\\N' else unescape(value) for value in row.rstrip('\n').split('\t')]
+        rows.append(dict(zip(columns, values)))
+      tables[table] = (columns, rows)
+  return tables
+
+
+def load_dump(path):
+  tables = read_copy_blocks(path)
+  # Parents first, for the foreign keys
+  for table in db.metadata.sorted_tables:
+    if table.name in tables:
+      db.session.execute(table.insert(), tables[table.name][1])
+  db.session.commit()
+
+
+@pytest.fixture(scope='session')
+def database(tmp_path_factory):
+  # The SQLite database of this worker and its pristine copy (xdist gives every worker its own tmp dir)
+  directory = tmp_path_factory.mktemp('trivia')
+  return directory / 'trivia_test.db', directory / 'trivia_template.db'
+
+
+@pytest.fixture(scope='session')
+def app(database):
+  path, template = database
+  app = create_app({'TESTING': True, 'DATABASE_URL': f'sqlite:///{path}'})
+  with app.app_context():
+    load_dump(TRIVIA_DUMP)
+    db.session.remove()
+    db.engine.dispose()
+  shutil.copyfile(path, template)
+  return app
+
+
+@pytest.fixture(autouse=True)
+def fresh_database(request, app, database):
+  path, template = database
+  with app.app_context():
+    db.session.remove()
+    # No pooled connection may outlive the file it was opened on
+    db.engine.dispose()
+  shutil.copyfile(template, path)
+  app.extensions['questions_changed']()
+  app.extensions['categories_cache'].invalidate()
+
+  # unittest test cases (test_flaskr.TriviaTestCase) pick the app up in setUp()
+  if request.instance is not None:
+    request.instance.shared_app = app
+  yield
+  with app.app_context():
+    db.session.remove()
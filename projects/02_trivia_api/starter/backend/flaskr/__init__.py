@@ -1,32 +1,150 @@
 import os
-from flask import Flask, request, abort, jsonify
+import time
+import codecs
+import click
+from flask import Flask, request, abort, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-import random
-
-from models import setup_db, Question, Category
+from flask_migrate import Migrate
+from fsnd_db import pool_metrics
+
+from models import setup_db, db, database_path, Question, Category
+from .cache import TTLCache
+from .quiz import QuizDraw
+from .quiz_sessions import QuizSessions
+from .categories import CategoriesCache
+from .search import QuestionSearch
+from .serialization import jsonify, json_provider
+from .compression import Compressor
+from .bulk import FORMATS, MIMETYPES, QuestionImporter, QuestionExporter, format_for_filename, format_for_mimetype
 
 QUESTIONS_PER_PAGE = 10
-
-def create_categories_object(categories):
-  categories_object = {}
-  for category in categories:
-    categories_object[str(category.id)] = category.type
-  return categories_object
-
-def paginate_questions(questions, request):
-  page = request.args.get('page', 1, type=int)
-  start = (page-1) * QUESTIONS_PER_PAGE
-  end = start + QUESTIONS_PER_PAGE
-
-  formatted_questions = [question.format() for question in questions]
-  return formatted_questions[start:end]
+# Seconds a question count is reused before being queried again
+COUNT_CACHE_TIMEOUT = 5
+
+'''
+paginate_query(query, request)
+    fetches only the requested page of a question query, either by page
+    number (?page=n, LIMIT/OFFSET) or after a question id (?after_id=n),
+    which doesn't slow down on the last pages of a large table.
+    Returns the formatted questions and the extra response fields of the
+    keyset mode (the id to pass as after_id for the next page, if any)
+'''
+def paginate_query(query, request):
+  after_id = request.args.get('after_id', None, type=int)
+  if after_id is None:
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+      return [], {}
+    questions = query.order_by(Question.id).limit(QUESTIONS_PER_PAGE).offset((page - 1) * QUESTIONS_PER_PAGE).all()
+    return [question.format() for question in questions], {}
+
+  # One extra row tells whether there is a next page
+  questions = query.filter(Question.id > after_id).order_by(Question.id).limit(QUESTIONS_PER_PAGE + 1).all()
+  next_after_id = questions[QUESTIONS_PER_PAGE - 1].id if len(questions) > QUESTIONS_PER_PAGE else None
+  return [question.format() for question in questions[:QUESTIONS_PER_PAGE]], {'next_after_id': next_after_id}
+
+'''
+parse_category_id(value)
+    the category id of a quiz request as an int (0 for all categories), or
+    None when it isn't one. The frontend sends the keys of its categories
+    object, which are strings; lists, objects and the like are rejected
+    before they reach the caches keyed by category id
+'''
+def parse_category_id(value):
+  if isinstance(value, bool):
+    return None
+  if isinstance(value, int):
+    return value
+  if isinstance(value, str) and value.isdigit():
+    return int(value)
+  return None
 
 def create_app(test_config=None):
   # create and configure the app
   app = Flask(__name__)
-  setup_db(app)
+  app.config.from_mapping(
+    DATABASE_URL=os.environ.get('DATABASE_URL', database_path),
+    # 'memory' keeps quiz sessions in this process, 'redis' shares them between processes
+    QUIZ_SESSION_STORE=os.environ.get('QUIZ_SESSION_STORE', 'memory'),
+    QUIZ_SESSION_REDIS_URL=os.environ.get('QUIZ_SESSION_REDIS_URL', 'redis://localhost:6379/0'),
+    # Seconds a quiz session is kept after its last turn
+    QUIZ_SESSION_TTL=int(os.environ.get('QUIZ_SESSION_TTL', 3600)),
+    # 'auto' (orjson when installed), 'orjson' or 'stdlib'
+    JSON_PROVIDER=os.environ.get('JSON_PROVIDER', 'auto'),
+    # Smallest response, in bytes, worth compressing, and the gzip level
+    COMPRESS_MIN_SIZE=int(os.environ.get('COMPRESS_MIN_SIZE', 500)),
+    COMPRESS_LEVEL=int(os.environ.get('COMPRESS_LEVEL', 6))
+  )
+  if test_config is not None:
+    app.config.update(test_config)
+  setup_db(app, app.config['DATABASE_URL'])
+  migrate = Migrate(app, db)
+
+  # Serializes every jsonify() response (see serialization.py)
+  app.extensions['json_provider'] = json_provider(app.config['JSON_PROVIDER'])
+  # gzip/brotli for the larger responses, negotiated with Accept-Encoding (see compression.py)
+  compressor = Compressor(app.config['COMPRESS_MIN_SIZE'], app.config['COMPRESS_LEVEL'])
+
+  # Categories map and its ETag (see categories.py); call invalidate() after changing categories outside SQLAlchemy
+  categories_cache = CategoriesCache()
+  app.extensions['categories_cache'] = categories_cache
+  # COUNT(*) of all questions ('all') and of each category, cleared on every write
+  question_counts = TTLCache(COUNT_CACHE_TIMEOUT)
+  # Question ids of each category, for the quiz (see quiz.py)
+  quiz_draw = QuizDraw(db, Question)
+  # Server-side games, as an alternative to sending previous_questions (see quiz_sessions.py)
+  quiz_sessions = QuizSessions.from_config(quiz_draw, app.config)
+  # Ranked search over questions and answers (see search.py)
+  question_search = QuestionSearch(db, Question, QUESTIONS_PER_PAGE)
+
+  def questions_changed():
+    question_counts.clear()
+    quiz_draw.clear()
+    question_search.invalidate()
+  # Clears the caches above, for changes made to questions outside the API (scripts, tests)
+  app.extensions['questions_changed'] = questions_changed
   
+  '''
+  flask import-questions / flask export-questions: the same bulk import
+  and export from the command line
+  '''
+  @app.cli.command('import-questions')
+  @click.argument('file', type=click.File('r', encoding='utf-8'))
+  @click.option('--format', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+  @click.option('--batch-size', type=int, default=5000, show_default=True)
+  def import_questions_command(file, format, batch_size):
+    """Import questions from a CSV or JSON-lines FILE ('-' for stdin)."""
+    format = format or format_for_filename(file.name)
+    if format is None:
+      raise click.UsageError('Could not tell the format from the file name, use --format.')
+
+    importer = QuestionImporter(db, Question, Category, batch_size=batch_size,
+      on_progress=lambda report: click.echo(report, err=True))
+    report = importer.run(file, format)
+
+    for error in report.errors:
+      click.echo(f"line {error['line']}: {error['error']}", err=True)
+    if report.invalid > len(report.errors):
+      click.echo(f'... and {report.invalid - len(report.errors)} more invalid rows', err=True)
+    click.echo(report)
+
+  @app.cli.command('export-questions')
+  @click.argument('file', type=click.File('w', encoding='utf-8'), default='-')
+  @click.option('--format', type=click.Choice(FORMATS), help='Defaults to the file extension, or jsonl.')
+  @click.option('--category', type=int, help='Only export the questions of this category.')
+  @click.option('--batch-size', type=int, default=5000, show_default=True)
+  def export_questions_command(file, format, category, batch_size):
+    """Export questions to a CSV or JSON-lines FILE (stdout by default)."""
+    format = format or format_for_filename(getattr(file, 'name', '')) or 'jsonl'
+
+    exporter = QuestionExporter(db, Question, batch_size=batch_size)
+    start = time.perf_counter()
+    for chunk in exporter.run(format, category):
+      file.write(chunk)
+    elapsed = time.perf_counter() - start
+    click.echo(f'{exporter.exported} questions exported in {elapsed:.1f} s ({exporter.exported / elapsed:.0f} rows/s)', err=True)
+
   '''
   @DONE: Set up CORS. Allow '*' for origins. Delete the sample route after completing the TODOs
   '''
@@ -41,6 +159,10 @@ def create_app(test_config=None):
     response.headers.add('Access-Control-Allow-Methods', 'GET, POST, PATCH, DELETE, OPTIONS')
     return response
 
+  @app.after_request
+  def compress_response(response):
+    return compressor.compress(response, request.accept_encodings)
+
 
   '''
   @DONE: 
@@ -49,13 +171,21 @@ def create_app(test_config=None):
   '''
   @app.route('/categories')
   def get_categories():
-    categories = Category.query.order_by(Category.id).all()
-    categories_object = create_categories_object(categories)
+    categories_object, etag = categories_cache.get()
 
-    return jsonify({
-      'success': True,
-      'categories': categories_object
-    })
+    # The client already has these categories
+    # Weak comparison: the ETag of a compressed response is weak
+    if request.if_none_match.contains_weak(etag):
+      response = Response(status=304)
+    else:
+      response = jsonify({
+        'success': True,
+        'categories': categories_object
+      })
+    response.set_etag(etag)
+    # Cached copies may be used, as long as they are revalidated first
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
   '''
@@ -72,22 +202,22 @@ def create_app(test_config=None):
   '''
   @app.route('/questions')
   def get_questions():
-    questions = Question.query.order_by(Question.id).all()
-    paginated_questions = paginate_questions(questions, request)
+    paginated_questions, page_fields = paginate_query(Question.query, request)
+    total_questions = question_counts.get_or_set('all', Question.query.count)
 
     # Abort if paginated_questions is empty but questions is not - ie, an invalid page was requested
-    if not paginated_questions and questions:
+    if not paginated_questions and total_questions:
       abort(404)
 
-    categories = Category.query.order_by(Category.id).all()
-    categories_object = create_categories_object(categories)
+    categories_object, etag = categories_cache.get()
 
     return jsonify({
       'success': True,
       'questions': paginated_questions,
-      'total_questions': len(questions),
+      'total_questions': total_questions,
       'categories': categories_object,
-      'current_category': None
+      'current_category': None,
+      **page_fields
     })
 
   '''
@@ -104,6 +234,7 @@ def create_app(test_config=None):
       abort(404)
 
     question.delete()
+    questions_changed()
 
     return jsonify({
       'success': True,
@@ -130,12 +261,13 @@ def create_app(test_config=None):
     # Handle search
     search_term = body.get('searchTerm', None)
     if search_term is not None:
-      results = Question.query.filter(Question.question.ilike('%' + search_term + '%')).order_by(Question.id).all()
+      page = request.args.get('page', 1, type=int)
+      results, total_results = question_search.search(str(search_term), page)
 
       return jsonify({
         'success': True,
-        'questions': paginate_questions(results, request),
-        'total_questions': len(results),
+        'questions': [question.format() for question in results],
+        'total_questions': total_results,
         'current_category': None
       })
 
@@ -148,6 +280,7 @@ def create_app(test_config=None):
     try:
       q = Question(question=question, answer=answer, category=category, difficulty=difficulty)
       q.insert()
+      questions_changed()
     except:
       abort(422)
     finally:
@@ -158,6 +291,43 @@ def create_app(test_config=None):
       }), 201
 
 
+  '''
+  Bulk import and export (see bulk.py). The import reads the body as it
+  arrives, the export is streamed batch by batch.
+  '''
+  @app.route('/questions/import', methods=['POST'])
+  def import_questions():
+    # Body: CSV (text/csv) or JSON lines (application/x-ndjson)
+    format = format_for_mimetype(request.mimetype)
+    if format is None:
+      abort(415)
+
+    try:
+      report = QuestionImporter(db, Question, Category).run(codecs.iterdecode(request.stream, 'utf-8'), format)
+    except UnicodeDecodeError:
+      db.session.rollback()
+      abort(400)
+    finally:
+      # Batches inserted before an error are kept
+      questions_changed()
+
+    return jsonify({
+      'success': True,
+      **report.format()
+    })
+
+  @app.route('/questions/export')
+  def export_questions():
+    format = request.args.get('format', 'jsonl')
+    if format not in FORMATS:
+      abort(400)
+    category_id = request.args.get('category', None, type=int)
+
+    chunks = QuestionExporter(db, Question).run(format, category_id)
+    response = Response(stream_with_context(chunks), mimetype=MIMETYPES[format])
+    response.headers['Content-Disposition'] = f'attachment; filename=questions.{format}'
+    return response
+
   '''
   @DONE: ABOVE
   Create a POST endpoint to get questions based on a search term. 
@@ -179,18 +349,20 @@ def create_app(test_config=None):
   '''
   @app.route('/categories/<int:category_id>/questions')
   def get_questions_by_category(category_id):
-    questions = Question.query.filter(Question.category == category_id).order_by(Question.id).all()
-    paginated_questions = paginate_questions(questions, request)
+    questions = Question.query.filter(Question.category == category_id)
+    paginated_questions, page_fields = paginate_query(questions, request)
+    total_questions = question_counts.get_or_set(category_id, questions.count)
 
     # Abort if paginated_questions is empty but questions is not - ie, an invalid page was requested
-    if not paginated_questions and questions:
+    if not paginated_questions and total_questions:
       abort(404)
 
     return jsonify({
       'success': True,
       'questions': paginated_questions,
-      'total_questions': len(questions),
-      'current_category': category_id
+      'total_questions': total_questions,
+      'current_category': category_id,
+      **page_fields
     })
 
   '''
@@ -212,34 +384,87 @@ def create_app(test_config=None):
 
     previous_questions = body.get('previous_questions', [])
     quiz_category = body.get('quiz_category', None)
-    if quiz_category is None:
+    if not isinstance(quiz_category, dict):
       abort(400)
     
-    category_id = quiz_category.get('id', None)
+    category_id = parse_category_id(quiz_category.get('id', None))
     if category_id is None:
       abort(400)
 
-    potential_questions = []
-    if category_id == 0:   # Search for all categories
-      potential_questions = Question.query.filter(~Question.id.in_(previous_questions)).all()
-    else:
-      potential_questions = Question.query.filter(~Question.id.in_(previous_questions), Question.category == category_id).all()
-    
+    # Randomly choose one of the questions of the category (0 for all categories) not played yet
+    try:
+      question = quiz_draw.draw(category_id, previous_questions)
+    except TypeError:
+      abort(400)
+
     # If there are no more questions left, return None
-    if not potential_questions:
+    if question is None:
       return jsonify({
         'success': True,
         'question': None
       })
 
-    # Randomly choose one of the potential questions
-    question = random.choice(potential_questions)
-
     return jsonify({
       'success': True,
       'question': question.format()
     })
 
+  '''
+  Quiz sessions: the same game as POST /quizzes, with the questions
+  already played kept by the server. Start a session for a category,
+  then draw its questions one at a time with the returned token.
+  '''
+  @app.route('/quizzes/sessions', methods=['POST'])
+  def start_quiz_session():
+    body = request.get_json()
+    if body is None:
+      abort(400)
+
+    quiz_category = body.get('quiz_category', None)
+    category_id = parse_category_id(quiz_category.get('id', None)) if isinstance(quiz_category, dict) else None
+    if category_id is None:
+      abort(400)
+
+    token, total_questions = quiz_sessions.start(category_id)
+
+    return jsonify({
+      'success': True,
+      'session': token,
+      'total_questions': total_questions
+    }), 201
+
+  @app.route('/quizzes/sessions/<token>/next', methods=['POST'])
+  def next_quiz_session_question(token):
+    question, state = quiz_sessions.next_question(token)
+    if state is None:
+      abort(404)
+
+    return jsonify({
+      'success': True,
+      'question': question.format() if question is not None else None
+    })
+
+  @app.route('/quizzes/sessions/<token>', methods=['DELETE'])
+  def end_quiz_session(token):
+    if not quiz_sessions.end(token):
+      abort(404)
+
+    return jsonify({
+      'success': True,
+      'deleted': token
+    })
+
+  '''
+  Database connection pool state and counters (see libs/fsnd_db), to
+  tell pool exhaustion (waits, timeouts, slow checkouts) from slow queries
+  '''
+  @app.route('/metrics')
+  def get_metrics():
+    return jsonify({
+      'success': True,
+      'pool': pool_metrics(db.engine)
+    })
+
   '''
   @DONE: 
   Create error handlers for all expected errors 
@@ -269,6 +494,14 @@ def create_app(test_config=None):
       'message': 'method not allowed'
     }), 405
 
+  @app.errorhandler(415)
+  def unsupported_media_type(error):
+    return jsonify({
+      'success': False,
+      'error': 415,
+      'message': 'unsupported media type'
+    }), 415
+
   @app.errorhandler(422)
   def unprocessable_entity(error):
     return jsonify({
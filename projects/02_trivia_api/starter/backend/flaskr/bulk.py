@@ -0,0 +1,192 @@
+import csv
+import io
+import json
+import time
+
+from fsnd_import import FORMATS, ImportReport, format_for_filename, format_for_mimetype, read_rows
+
+'''
+Bulk import and export of questions, as CSV or JSON lines
+    one object per row with question, answer, category (a category id)
+    and difficulty (1 to 5); exports also have the id of each question,
+    which imports ignore: imported questions always get new ids.
+
+    Both directions work on a bounded number of rows at a time, so millions
+    of questions can be moved without holding them in memory: imports read
+    the input as it arrives and insert it in batches (COPY on PostgreSQL, a
+    multi-row executemany elsewhere), each batch in its own transaction;
+    exports fetch the questions by id ranges and yield them batch by batch.
+'''
+
+FIELDS = ('question', 'answer', 'category', 'difficulty')
+EXPORT_FIELDS = ('id',) + FIELDS
+MIMETYPES = {
+  'csv': 'text/csv',
+  'jsonl': 'application/x-ndjson'
+}
+BATCH_SIZE = 5000
+
+
+'''
+QuestionImportReport
+    what an import did so far, with how fast it went, passed to the progress
+    callback after every batch
+'''
+class QuestionImportReport(ImportReport):
+
+  def __init__(self):
+    super().__init__()
+    self.started_at = time.perf_counter()
+    self.elapsed = 0.0
+
+  @property
+  def rows_per_second(self):
+    return self.inserted / self.elapsed if self.elapsed else 0.0
+
+  def format(self):
+    return {
+      **self.as_dict(),
+      'seconds': round(self.elapsed, 3),
+      'rows_per_second': round(self.rows_per_second)
+    }
+
+  def __str__(self):
+    return f'{super().__str__()} in {self.elapsed:.1f} s ({self.rows_per_second:.0f} rows/s)'
+
+
+'''
+QuestionImporter
+    validates rows against the category ids, loaded once up front instead
+    of being looked up for every row, and inserts the valid ones in batches
+'''
+class QuestionImporter:
+
+  def __init__(self, db, question_model, category_model, batch_size=BATCH_SIZE, on_progress=None):
+    self.db = db
+    self.question_model = question_model
+    self.category_model = category_model
+    self.batch_size = batch_size
+    # Called with the report after every batch
+    self.on_progress = on_progress
+    self.category_ids = None
+
+  def load_category_ids(self):
+    self.category_ids = {category_id for category_id, in self.db.session.query(self.category_model.id)}
+
+  def parse_row(self, row):
+    # Validated row ready to insert; raises ValueError with the reason otherwise
+    if not isinstance(row, dict):
+      raise ValueError('Not a valid row')
+    missing = [field for field in FIELDS if row.get(field) in (None, '')]
+    if missing:
+      raise ValueError('Missing ' + ', '.join(missing))
+    try:
+      category = int(row['category'])
+      difficulty = int(row['difficulty'])
+    except (TypeError, ValueError):
+      raise ValueError('Category and difficulty must be integers')
+    if category not in self.category_ids:
+      raise ValueError(f'Unknown category {category}')
+    if not 1 <= difficulty <= 5:
+      raise ValueError('Difficulty must be between 1 and 5')
+    return {'question': str(row['question']), 'answer': str(row['answer']), 'category': category, 'difficulty': difficulty}
+
+  def copy_batch(self, rows):
+    # COPY ... FROM STDIN, with the batch written as CSV in memory
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+      writer.writerow([row[field] for field in FIELDS])
+    buffer.seek(0)
+    table = self.question_model.__tablename__
+    cursor = self.db.session.connection().connection.cursor()
+    try:
+      cursor.copy_expert(f'COPY {table} ({", ".join(FIELDS)}) FROM STDIN WITH (FORMAT csv)', buffer)
+    finally:
+      cursor.close()
+
+  def insert_batch(self, rows, report):
+    if self.db.session.get_bind().dialect.name == 'postgresql':
+      self.copy_batch(rows)
+    else:
+      self.db.session.execute(self.question_model.__table__.insert(), rows)
+    self.db.session.commit()
+    report.inserted += len(rows)
+    report.elapsed = time.perf_counter() - report.started_at
+    if self.on_progress is not None:
+      self.on_progress(report)
+
+  def run(self, lines, format):
+    # Imports the rows of an iterable of text lines (an open file, a request stream...)
+    report = QuestionImportReport()
+    if self.category_ids is None:
+      self.load_category_ids()
+
+    batch = []
+    for line_number, row in read_rows(lines, format):
+      report.read += 1
+      try:
+        batch.append(self.parse_row(row))
+      except ValueError as e:
+        report.add_error(line_number, str(e))
+        continue
+      if len(batch) == self.batch_size:
+        self.insert_batch(batch, report)
+        batch = []
+    if batch:
+      self.insert_batch(batch, report)
+    report.elapsed = time.perf_counter() - report.started_at
+    return report
+
+
+'''
+QuestionExporter
+    the questions (of one category, if given) in id order, as chunks of
+    text of at most `batch_size` rows each. Every batch is a separate query
+    starting after the last id of the previous one, so nothing is held
+    open between chunks and no chunk costs more than the first.
+'''
+class QuestionExporter:
+
+  def __init__(self, db, question_model, batch_size=BATCH_SIZE):
+    self.db = db
+    self.question_model = question_model
+    self.batch_size = batch_size
+    self.exported = 0
+
+  def batches(self, category_id=None):
+    model = self.question_model
+    query = self.db.session.query(*[getattr(model, field) for field in EXPORT_FIELDS])
+    if category_id is not None:
+      query = query.filter(model.category == category_id)
+    last_id = None
+    while True:
+      batch_query = query if last_id is None else query.filter(model.id > last_id)
+      # Plain rows rather than ORM results, which are much slower to build
+      rows = self.db.session.execute(batch_query.order_by(model.id).limit(self.batch_size).statement).fetchall()
+      if not rows:
+        return
+      yield rows
+      last_id = rows[-1][0]
+
+  def run(self, format, category_id=None):
+    if format not in FORMATS:
+      raise ValueError(f'Unknown format: {format}')
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == 'csv':
+      writer.writerow(EXPORT_FIELDS)
+    for rows in self.batches(category_id):
+      if format == 'csv':
+        writer.writerows(rows)
+      else:
+        for row in rows:
+          buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, row))) + '\n')
+      self.exported += len(rows)
+      yield buffer.getvalue()
+      buffer.seek(0)
+      buffer.truncate()
+    # The CSV header of an empty export
+    if buffer.tell():
+      yield buffer.getvalue()
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+
+'''
+TTLCache
+    small in-process cache for values that are expensive to compute but
+    cheap to keep, like COUNT(*) results. Entries expire after `timeout`
+    seconds, so writes made by other processes show up eventually; writes
+    made through this app invalidate the entries right away.
+
+    Keys can come from requests (category ids), so the cache holds at most
+    `max_entries` of them, dropping the least recently used. Concurrent
+    misses on a key wait for one build() instead of each running it, and a
+    value whose build started before an invalidation is returned but not
+    kept.
+'''
+class TTLCache:
+
+  def __init__(self, timeout=5, max_entries=256):
+    self.timeout = timeout
+    self.max_entries = max_entries
+    # key: (value, expires at), least recently used first
+    self.entries = OrderedDict()
+    # key: lock held by the thread building the value of the key
+    self.builds = {}
+    # Incremented by every invalidation
+    self.generation = 0
+    self.lock = threading.Lock()
+
+  def lookup(self, key):
+    # The value of a fresh entry, or None; called with the lock held
+    entry = self.entries.get(key)
+    if entry is None:
+      return None
+    if entry[1] <= time.monotonic():
+      del self.entries[key]
+      return None
+    self.entries.move_to_end(key)
+    return entry
+
+  def get_or_set(self, key, build):
+    with self.lock:
+      entry = self.lookup(key)
+      if entry is not None:
+        return entry[0]
+      build_lock = self.builds.setdefault(key, threading.Lock())
+
+    with build_lock:
+      with self.lock:
+        # Built by the thread this one waited for
+        entry = self.lookup(key)
+        if entry is not None:
+          return entry[0]
+        generation = self.generation
+
+      built = False
+      try:
+        value = build()
+        built = True
+      finally:
+        with self.lock:
+          if built and self.generation == generation:
+            self.entries[key] = (value, time.monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+              self.entries.popitem(last=False)
+          if self.builds.get(key) is build_lock:
+            del self.builds[key]
+      return value
+
+  def invalidate(self, *keys):
+    with self.lock:
+      self.generation += 1
+      for key in keys:
+        self.entries.pop(key, None)
+
+  def clear(self):
+    with self.lock:
+      self.generation += 1
+      self.entries.clear()
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import weakref
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Category
+from .cache import TTLCache
+
+# Every CategoriesCache, to be invalidated when a session commits changes to categories
+_caches = weakref.WeakSet()
+
+'''
+CategoriesCache
+    the {id: type} map of every category and its ETag, shared by the
+    endpoints that return it. Categories almost never change, so the map is
+    kept for `timeout` seconds; categories changed through SQLAlchemy in this
+    process invalidate it as soon as the change is committed. Changes made
+    elsewhere (another process, psql) show up once it expires, or after an
+    explicit invalidate().
+'''
+class CategoriesCache:
+
+  def __init__(self, timeout=300):
+    self.entries = TTLCache(timeout)
+    _caches.add(self)
+
+  def load(self):
+    categories = Category.query.order_by(Category.id).all()
+    categories_object = {str(category.id): category.type for category in categories}
+    etag = hashlib.sha1(json.dumps(categories_object, sort_keys=True).encode()).hexdigest()
+    return categories_object, etag
+
+  def get(self):
+    # (categories object, ETag)
+    return self.entries.get_or_set('categories', self.load)
+
+  def invalidate(self):
+    self.entries.clear()
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_category_changes(session, flush_context):
+  # new, dirty and deleted still hold what was just flushed
+  if any(isinstance(instance, Category) for instance in chain(session.new, session.dirty, session.deleted)):
+    session.info['categories_changed'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_caches(session):
+  if session.info.pop('categories_changed', False):
+    for cache in list(_caches):
+      cache.invalidate()
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_category_changes(session):
+  session.info.pop('categories_changed', None)
@@ -0,0 +1,55 @@
+import gzip
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+
+'''
+Compressor
+    gzip (or brotli, when the brotli package is installed and the client
+    prefers it or accepts both) for the text responses of the API that are
+    at least `min_size` bytes. Pages of questions shrink several times;
+    below a few hundred bytes the headers and CPU time aren't worth it.
+    Streamed responses (the question export) are sent as they are.
+'''
+class Compressor:
+
+  def __init__(self, min_size=500, level=6, brotli_quality=5):
+    self.min_size = min_size
+    self.level = level
+    self.brotli_quality = brotli_quality
+    self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+  def compressible(self, response):
+    return not (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES)
+
+  def compress(self, response, accept_encodings):
+    if not self.compressible(response):
+      return response
+    # Caches must keep the compressed and uncompressed copies apart
+    response.vary.add('Accept-Encoding')
+
+    data = response.get_data()
+    if len(data) < self.min_size:
+      return response
+    # Highest quality encoding the client accepts, brotli first on ties
+    encoding = accept_encodings.best_match(self.encodings)
+    if encoding is None:
+      return response
+
+    if encoding == 'br':
+      response.set_data(brotli.compress(data, quality=self.brotli_quality))
+    else:
+      response.set_data(gzip.compress(data, compresslevel=self.level))
+    response.headers['Content-Encoding'] = encoding
+    # The bytes differ from the uncompressed response, the content doesn't
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+      response.set_etag(etag, weak=True)
+    return response
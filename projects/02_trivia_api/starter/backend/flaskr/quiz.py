@@ -0,0 +1,70 @@
+import random
+from array import array
+
+from .cache import TTLCache
+
+# Random picks tried before falling back to listing the remaining ids
+MAX_ATTEMPTS = 32
+
+'''
+QuizDraw
+    picks a random question that isn't one of the previous questions
+    of a game, without loading the candidate questions themselves.
+
+    The ids of each category (and of all questions, category 0) are loaded
+    once into a compact array, sorted by id, and reused for `timeout` seconds. A draw picks
+    random positions in that array until it finds an id that wasn't played
+    yet, which takes one or two tries for most of a game; only when almost
+    every question was played are the remaining ids listed. The question is
+    then fetched by primary key.
+'''
+class QuizDraw:
+
+  def __init__(self, db, question_model, timeout=60, rng=None, max_pools=32):
+    self.db = db
+    self.question_model = question_model
+    # A pool can hold every question id, so keep only a few categories
+    self.pools = TTLCache(timeout, max_entries=max_pools)
+    self.rng = rng or random.Random()
+
+  def load_ids(self, category_id):
+    query = self.db.session.query(self.question_model.id)
+    if category_id != 0:
+      query = query.filter(self.question_model.category == category_id)
+    query = query.order_by(self.question_model.id)
+    # Plain rows rather than ORM results, which are much slower to build for a million ids
+    return array('l', (question_id for question_id, in self.db.session.execute(query.statement)))
+
+  def ids(self, category_id):
+    return self.pools.get_or_set(category_id, lambda: self.load_ids(category_id))
+
+  def pick_id(self, ids, previous_ids):
+    if len(previous_ids) < len(ids):
+      for _ in range(MAX_ATTEMPTS):
+        question_id = ids[self.rng.randrange(len(ids))]
+        if question_id not in previous_ids:
+          return question_id
+
+    remaining = [question_id for question_id in ids if question_id not in previous_ids]
+    return self.rng.choice(remaining) if remaining else None
+
+  def draw(self, category_id, previous_questions):
+    '''
+    draw(category_id, previous_questions)
+        a random question of the category (0 for all categories) whose id
+        isn't in previous_questions, or None when they were all played
+    '''
+    previous_ids = set(previous_questions)
+    for attempt in range(2):
+      question_id = self.pick_id(self.ids(category_id), previous_ids)
+      if question_id is None:
+        return None
+      question = self.question_model.query.get(question_id)
+      if question is not None:
+        return question
+      # Deleted since the ids were loaded (possibly by another process): reload them once
+      self.pools.invalidate(category_id)
+    return None
+
+  def clear(self):
+    self.pools.clear()
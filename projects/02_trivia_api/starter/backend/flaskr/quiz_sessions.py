@@ -0,0 +1,206 @@
+import hashlib
+import json
+import random
+import secrets
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+'''
+Quiz sessions
+    an alternative to sending previous_questions on every turn: the server
+    keeps, for each game, a shuffled deck of the questions of the category.
+
+    The deck is never stored. It is a keyed pseudo-random permutation of
+    the positions 0..count-1 in the sorted id array of the category (a
+    small Feistel network), so a session only holds a few integers: the
+    smallest and largest id and the number of questions when the game
+    started, the permutation key and how far into the deck the game is.
+    Every turn maps one position to an id, whether the ids are dense or
+    spread over a much larger range. Questions added during the game get
+    larger ids and aren't part of it. If questions of the game are deleted
+    or change category, the positions after them shift: the rest of the
+    game then draws from the remaining ones, and a question may come up
+    twice or not at all.
+'''
+
+FEISTEL_ROUNDS = 4
+
+
+def feistel(value, key, half_bits):
+  # Permutation of [0, 2 ** (2 * half_bits)) keyed by `key`
+  mask = (1 << half_bits) - 1
+  left, right = value >> half_bits, value & mask
+  for round_number in range(FEISTEL_ROUNDS):
+    digest = hashlib.blake2b(f'{key}:{round_number}:{right}'.encode(), digest_size=8).digest()
+    left, right = right, left ^ (int.from_bytes(digest, 'big') & mask)
+  return (left << half_bits) | right
+
+
+def deck_position(index, key, size):
+  # Position of the index-th card in a shuffled deck of `size` cards
+  half_bits = max(1, (max(size - 1, 1).bit_length() + 1) // 2)
+  position = feistel(index, key, half_bits)
+  # The permutation covers at most four times the deck: walk the cycle until back inside it
+  while position >= size:
+    position = feistel(position, key, half_bits)
+  return position
+
+
+'''
+MemorySessionStore
+    sessions kept in this process, dropped `ttl` seconds after their last turn
+'''
+class MemorySessionStore:
+
+  def __init__(self, ttl=3600):
+    self.ttl = ttl
+    self.sessions = {}
+    self.lock = threading.Lock()
+
+  def get(self, token):
+    with self.lock:
+      entry = self.sessions.get(token)
+      if entry is None or entry[1] <= time.monotonic():
+        return None
+      return dict(entry[0])
+
+  def save(self, token, state):
+    now = time.monotonic()
+    with self.lock:
+      self.sessions[token] = (dict(state), now + self.ttl)
+      # Expired sessions are only looked for now and then
+      if len(self.sessions) % 1000 == 0:
+        for expired in [token for token, (_, expires_at) in self.sessions.items() if expires_at <= now]:
+          del self.sessions[expired]
+
+  def claim(self, token):
+    # The state with the position this turn plays, moved past it in the store in the same step;
+    # position is size once the deck is played
+    with self.lock:
+      entry = self.sessions.get(token)
+      if entry is None or entry[1] <= time.monotonic():
+        return None
+      state = entry[0]
+      if state['position'] < state['size']:
+        self.sessions[token] = (dict(state, position=state['position'] + 1), time.monotonic() + self.ttl)
+      return dict(state)
+
+  def delete(self, token):
+    with self.lock:
+      return self.sessions.pop(token, None) is not None
+
+
+'''
+RedisSessionStore
+    sessions shared by every process, through a redis-py client; Redis drops
+    them `ttl` seconds after their last turn. Turns claim their position
+    with WATCH/MULTI, so concurrent turns of a game never play the same one
+'''
+class RedisSessionStore:
+
+  def __init__(self, client, ttl=3600, prefix='trivia:quiz:'):
+    self.client = client
+    self.ttl = ttl
+    self.prefix = prefix
+
+  def get(self, token):
+    value = self.client.get(self.prefix + token)
+    return json.loads(value) if value is not None else None
+
+  def save(self, token, state):
+    self.client.set(self.prefix + token, json.dumps(state), ex=self.ttl)
+
+  def claim(self, token):
+    from redis import WatchError
+    key = self.prefix + token
+    with self.client.pipeline() as pipe:
+      while True:
+        try:
+          pipe.watch(key)
+          value = pipe.get(key)
+          if value is None:
+            return None
+          state = json.loads(value)
+          if state['position'] < state['size']:
+            pipe.multi()
+            pipe.set(key, json.dumps(dict(state, position=state['position'] + 1)), ex=self.ttl)
+            pipe.execute()
+          return state
+        except WatchError:
+          # Another turn of the game claimed a position first
+          continue
+
+  def delete(self, token):
+    return bool(self.client.delete(self.prefix + token))
+
+
+'''
+QuizSessions
+    starts sessions and draws their questions, using the sorted id arrays
+    of a QuizDraw to tell which ids of the range are questions of the category
+'''
+class QuizSessions:
+
+  def __init__(self, quiz_draw, store, rng=None):
+    self.quiz_draw = quiz_draw
+    self.store = store
+    self.rng = rng or random.SystemRandom()
+
+  @classmethod
+  def from_config(cls, quiz_draw, config):
+    # QUIZ_SESSION_STORE is 'memory' (default) or 'redis'
+    ttl = config.get('QUIZ_SESSION_TTL', 3600)
+    if config.get('QUIZ_SESSION_STORE', 'memory') == 'redis':
+      import redis
+      store = RedisSessionStore(redis.Redis.from_url(config['QUIZ_SESSION_REDIS_URL']), ttl)
+    else:
+      store = MemorySessionStore(ttl)
+    return cls(quiz_draw, store)
+
+  def start(self, category_id):
+    # Returns the token of the new session and the number of questions it can draw from
+    ids = self.quiz_draw.ids(category_id)
+    token = secrets.token_urlsafe(16)
+    self.store.save(token, {
+      'category': category_id,
+      'first_id': ids[0] if ids else 0,
+      'last_id': ids[-1] if ids else 0,
+      'size': len(ids),
+      'key': self.rng.getrandbits(64),
+      'position': 0
+    })
+    return token, len(ids)
+
+  def next_question(self, token):
+    '''
+    next_question(token)
+        the next question of the session and the session state, None as
+        the question when they were all played, or (None, None) when the
+        session doesn't exist or expired
+    '''
+    # Every position is claimed from the store, so concurrent turns of a game get different questions
+    state = self.store.claim(token)
+    if state is None:
+      return None, None
+
+    ids = self.quiz_draw.ids(state['category'])
+    # The questions of the game: the ids of the category that were in its range when it started
+    start = bisect_left(ids, state['first_id'])
+    count = bisect_right(ids, state['last_id']) - start
+    while state['position'] < state['size']:
+      index = deck_position(state['position'], state['key'], state['size'])
+      if index < count:
+        question = self.quiz_draw.question_model.query.get(ids[start + index])
+        if question is not None:
+          return question, dict(state, position=state['position'] + 1)
+      claimed = self.store.claim(token)
+      if claimed is None:
+        # Ended during the turn
+        break
+      state = claimed
+
+    return None, state
+
+  def end(self, token):
+    return self.store.delete(token)
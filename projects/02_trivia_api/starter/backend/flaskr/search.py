@@ -0,0 +1,174 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+# Texts are indexed by their substrings of up to NGRAM_SIZE characters
+NGRAM_SIZE = 3
+
+# Relative weight of a match in each field, mirroring the A/B weights of SEARCH_DOCUMENT
+FIELD_WEIGHTS = {
+  'question': 1.0,
+  'answer': 0.4
+}
+
+# Indexed by the b8e2d41c7f90 migration; must stay identical to the expression of
+# ix_questions_search_document for PostgreSQL to use the index
+SEARCH_DOCUMENT = ("setweight(to_tsvector('simple', coalesce(question, '')), 'A') || "
+                   "setweight(to_tsvector('simple', coalesce(answer, '')), 'B')")
+
+
+def tokenize(text):
+  if not text:
+    return []
+  return TOKEN_PATTERN.findall(text.lower())
+
+
+def prefix_tsquery(tokens):
+  # "heavi org" -> "heavi:* & org:*". Tokens only contain word characters, so they can't inject tsquery operators
+  return ' & '.join(token + ':*' for token in tokens)
+
+'''
+QuestionSearchIndex
+    inverted index of token -> {question id: weight} over the question and
+    answer texts, with a sorted token list for prefix lookups, and of
+    n-gram -> {question id} for each text, so the substring matches don't
+    scan every question. Used when the database isn't PostgreSQL, e.g. by
+    tests running on SQLite.
+'''
+class QuestionSearchIndex:
+
+  def __init__(self):
+    self.postings = defaultdict(dict)
+    self.texts = {}
+    self.ngrams = {field: defaultdict(set) for field in FIELD_WEIGHTS}
+    self.sorted_tokens = None
+
+  def add(self, question_id, question, answer):
+    # Each question_id is added once: QuestionSearch builds a new index after writes
+    self.texts[question_id] = {'question': (question or '').lower(), 'answer': (answer or '').lower()}
+    for field, text in self.texts[question_id].items():
+      ngrams = self.ngrams[field]
+      for size in range(1, NGRAM_SIZE + 1):
+        for start in range(len(text) - size + 1):
+          ngrams[text[start:start + size]].add(question_id)
+    for field, text in (('question', question), ('answer', answer)):
+      for token in tokenize(text):
+        postings = self.postings[token]
+        postings[question_id] = postings.get(question_id, 0) + FIELD_WEIGHTS[field]
+    self.sorted_tokens = None
+
+  def prefix_matches(self, prefix):
+    # Union of the postings of every indexed token starting with prefix
+    if self.sorted_tokens is None:
+      self.sorted_tokens = sorted(self.postings)
+    matches = {}
+    position = bisect_left(self.sorted_tokens, prefix)
+    while position < len(self.sorted_tokens) and self.sorted_tokens[position].startswith(prefix):
+      for question_id, weight in self.postings[self.sorted_tokens[position]].items():
+        matches[question_id] = matches.get(question_id, 0) + weight
+      position += 1
+    return matches
+
+  def substring_matches(self, field, term):
+    # Questions whose lowercase field contains term: the questions having every n-gram of term,
+    # checked against the text when term is longer than an n-gram
+    ngrams = self.ngrams[field]
+    if not term:
+      return self.texts.keys()
+    if len(term) <= NGRAM_SIZE:
+      return ngrams.get(term, ())
+    candidates = sorted((ngrams.get(term[start:start + NGRAM_SIZE], set())
+                         for start in range(len(term) - NGRAM_SIZE + 1)), key=len)
+    return [question_id for question_id in candidates[0].intersection(*candidates[1:])
+            if term in self.texts[question_id][field]]
+
+  def search(self, term):
+    # Returns the matching question ids, best matches first
+    term = (term or '').lower()
+    scores = None
+    for token in tokenize(term):
+      matches = self.prefix_matches(token)
+      if scores is None:
+        scores = matches
+      else:
+        scores = {question_id: score + matches[question_id] for question_id, score in scores.items() if question_id in matches}
+
+    scores = scores or {}
+    # Keep the substring matching the search always had; a question matching in both fields counts once
+    question_matches = set(self.substring_matches('question', term))
+    for question_id in question_matches:
+      scores[question_id] = scores.get(question_id, 0) + FIELD_WEIGHTS['question']
+    for question_id in self.substring_matches('answer', term):
+      if question_id not in question_matches:
+        scores[question_id] = scores.get(question_id, 0) + FIELD_WEIGHTS['answer']
+
+    return [question_id for question_id, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0]))]
+
+'''
+QuestionSearch
+    ranked search over the question and answer of every question, one page
+    at a time. On PostgreSQL it runs against the full-text and trigram
+    indexes; elsewhere against a QuestionSearchIndex built on first use.
+'''
+class QuestionSearch:
+
+  def __init__(self, db, question_model, per_page=10):
+    self.db = db
+    self.question_model = question_model
+    self.per_page = per_page
+    self.index = None
+
+  def invalidate(self):
+    # Called after writes, so the in-memory index is rebuilt by the next search
+    self.index = None
+
+  def search(self, term, page=1):
+    # (questions of the page, total number of matches)
+    if page < 1:
+      return [], 0
+    if self.db.engine.dialect.name == 'postgresql':
+      return self.search_postgres(term, page)
+    return self.search_in_memory(term, page)
+
+  def search_postgres(self, term, page):
+    db = self.db
+    model = self.question_model
+    tokens = tokenize(term)
+    pattern = '%' + term + '%'
+    substring_matches = db.or_(model.question.ilike(pattern), model.answer.ilike(pattern))
+
+    if tokens:
+      document = db.literal_column('(' + SEARCH_DOCUMENT + ')')
+      tsquery = db.func.to_tsquery('simple', prefix_tsquery(tokens))
+      matches = db.or_(document.op('@@')(tsquery), substring_matches)
+      rank = db.func.ts_rank(document, tsquery) + \
+        db.func.greatest(db.func.similarity(model.question, term), db.func.similarity(model.answer, term))
+      order = (rank.desc(), model.id)
+    else:
+      matches = substring_matches
+      order = (model.id,)
+
+    query = model.query.filter(matches)
+    total = query.count()
+    questions = query.order_by(*order).limit(self.per_page).offset((page - 1) * self.per_page).all()
+    return questions, total
+
+  def build_index(self):
+    model = self.question_model
+    index = QuestionSearchIndex()
+    for question_id, question, answer in self.db.session.query(model.id, model.question, model.answer):
+      index.add(question_id, question, answer)
+    return index
+
+  def search_in_memory(self, term, page):
+    if self.index is None:
+      self.index = self.build_index()
+    ids = self.index.search(term)
+    page_ids = ids[(page - 1) * self.per_page:page * self.per_page]
+    if not page_ids:
+      return [], len(ids)
+
+    questions = self.question_model.query.filter(self.question_model.id.in_(page_ids)).all()
+    position = {question_id: i for i, question_id in enumerate(page_ids)}
+    return sorted(questions, key=lambda question: position[question.id]), len(ids)
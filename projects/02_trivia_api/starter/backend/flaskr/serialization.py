@@ -0,0 +1,60 @@
+import json
+
+from flask import current_app
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+'''
+JSON providers
+    turn the dicts built by the endpoints into the bytes of a response.
+    OrjsonProvider uses the orjson package (optional, several times faster
+    on question lists); StdlibProvider the json module with Flask's encoder.
+    Both write compact JSON, with sorted keys unless JSON_SORT_KEYS is off,
+    like flask.jsonify.
+'''
+class StdlibProvider:
+  name = 'stdlib'
+
+  def dumps(self, obj, sort_keys=True):
+    return json.dumps(obj, cls=current_app.json_encoder, sort_keys=sort_keys, separators=(',', ':')).encode()
+
+
+class OrjsonProvider:
+  name = 'orjson'
+
+  def dumps(self, obj, sort_keys=True):
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+    # Types orjson doesn't know (Decimal...) go through Flask's encoder
+    return orjson.dumps(obj, default=current_app.json_encoder().default, option=option)
+
+
+def json_provider(name='auto'):
+  # 'auto' picks orjson when it is installed
+  if name == 'orjson' or (name == 'auto' and orjson is not None):
+    if orjson is None:
+      raise RuntimeError('JSON_PROVIDER is orjson but the orjson package is not installed')
+    return OrjsonProvider()
+  if name in ('auto', 'stdlib'):
+    return StdlibProvider()
+  raise ValueError(f'Unknown JSON provider: {name}')
+
+'''
+jsonify(*args, **kwargs)
+    flask.jsonify, serialized by the provider of the app (set up by
+    create_app() in app.extensions['json_provider']). Still pretty prints
+    in debug mode or with JSONIFY_PRETTYPRINT_REGULAR.
+'''
+def jsonify(*args, **kwargs):
+  if args and kwargs:
+    raise TypeError('jsonify() behavior undefined when passed both args and kwargs')
+  data = args[0] if len(args) == 1 else args or kwargs
+
+  config = current_app.config
+  if config['JSONIFY_PRETTYPRINT_REGULAR'] or current_app.debug:
+    body = json.dumps(data, cls=current_app.json_encoder, sort_keys=config['JSON_SORT_KEYS'], indent=2).encode()
+  else:
+    body = current_app.extensions['json_provider'].dumps(data, sort_keys=config['JSON_SORT_KEYS'])
+  return current_app.response_class(body + b'\n', mimetype=config['JSONIFY_MIMETYPE'])
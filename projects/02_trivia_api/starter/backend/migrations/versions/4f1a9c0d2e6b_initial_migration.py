@@ -0,0 +1,43 @@
+"""Initial migration
+
+Revision ID: 4f1a9c0d2e6b
+Revises: 
+Create Date: 2026-10-18 14:31:09.412337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1a9c0d2e6b'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases restored from trivia.psql already have these tables, with the
+    # same columns: only create the ones that are missing
+    existing_tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'categories' not in existing_tables:
+        op.create_table('categories',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'questions' not in existing_tables:
+        op.create_table('questions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('question', sa.String(), nullable=True),
+        sa.Column('answer', sa.String(), nullable=True),
+        sa.Column('difficulty', sa.Integer(), nullable=True),
+        sa.Column('category', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('questions')
+    op.drop_table('categories')
@@ -0,0 +1,78 @@
+"""Integer category foreign key on questions
+
+Revision ID: 5c0e7a3b9d14
+Revises: b8e2d41c7f90
+Create Date: 2026-10-18 15:52:27.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c0e7a3b9d14'
+down_revision = 'b8e2d41c7f90'
+branch_labels = None
+depends_on = None
+
+# Questions converted per UPDATE when the category column holds text
+BATCH_SIZE = 10000
+
+
+def category_id_expression(dialect_name):
+    # The text category of a question as the id of an existing category, NULL when it isn't one
+    if dialect_name == 'postgresql':
+        category = "CASE WHEN trim(questions.category) ~ '^[0-9]{1,9}$' THEN CAST(trim(questions.category) AS INTEGER) END"
+    else:
+        category = 'CAST(questions.category AS INTEGER)'
+    return f'(SELECT categories.id FROM categories WHERE categories.id = {category})'
+
+
+def convert_category_column(bind):
+    # Databases created by db.create_all() before this revision store the
+    # category as text: copy it to a new integer column, then swap the columns
+    columns = {column['name'] for column in sa.inspect(bind).get_columns('questions')}
+    if 'category_id' not in columns:
+        op.add_column('questions', sa.Column('category_id', sa.Integer(), nullable=True))
+
+    first_id, last_id = bind.execute(sa.text('SELECT min(id), max(id) FROM questions')).first()
+    if first_id is not None:
+        backfill = sa.text(f'UPDATE questions SET category_id = {category_id_expression(bind.dialect.name)} '
+                           'WHERE id >= :start AND id < :end AND category_id IS NULL')
+        # Each batch commits on its own, so the table is never locked for
+        # the whole backfill; an interrupted upgrade resumes where it stopped
+        with op.get_context().autocommit_block():
+            for start in range(first_id, last_id + 1, BATCH_SIZE):
+                bind.execute(backfill, start=start, end=start + BATCH_SIZE)
+
+    with op.batch_alter_table('questions') as batch_op:
+        batch_op.drop_column('category')
+        batch_op.alter_column('category_id', new_column_name='category')
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {column['name']: column for column in sa.inspect(bind).get_columns('questions')}
+    if not isinstance(columns['category']['type'], sa.Integer):
+        convert_category_column(bind)
+
+    # Databases restored from trivia.psql already have this foreign key (named "category")
+    inspector = sa.inspect(bind)
+    if not any(foreign_key['constrained_columns'] == ['category'] for foreign_key in inspector.get_foreign_keys('questions')):
+        with op.batch_alter_table('questions') as batch_op:
+            batch_op.create_foreign_key('fk_questions_category', 'categories', ['category'], ['id'],
+                                        onupdate='CASCADE', ondelete='SET NULL')
+
+    # Databases whose tables were created by db.create_all() already have the index
+    if not any(index['name'] == 'ix_questions_category_id' for index in inspector.get_indexes('questions')):
+        op.create_index('ix_questions_category_id', 'questions', ['category', 'id'], unique=False)
+
+
+def downgrade():
+    # The column stays an integer, as created by the initial migration and trivia.psql
+    op.drop_index('ix_questions_category_id', table_name='questions')
+
+    inspector = sa.inspect(op.get_bind())
+    if any(foreign_key['name'] == 'fk_questions_category' for foreign_key in inspector.get_foreign_keys('questions')):
+        with op.batch_alter_table('questions') as batch_op:
+            batch_op.drop_constraint('fk_questions_category', type_='foreignkey')
@@ -0,0 +1,36 @@
+"""Search indexes for questions
+
+Revision ID: b8e2d41c7f90
+Revises: 4f1a9c0d2e6b
+Create Date: 2026-10-18 14:40:52.870153
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e2d41c7f90'
+down_revision = '4f1a9c0d2e6b'
+branch_labels = None
+depends_on = None
+
+# Same expression as flaskr.search.SEARCH_DOCUMENT, which must match it for the index to be used
+SEARCH_DOCUMENT = ("setweight(to_tsvector('simple', coalesce(question, '')), 'A') || "
+                   "setweight(to_tsvector('simple', coalesce(answer, '')), 'B')")
+
+
+def upgrade():
+    # Trigram indexes let the substring matching (ILIKE '%term%') use an index
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # An expression index needs no extra column or trigger to stay up to date
+    op.execute(f'CREATE INDEX ix_questions_search_document ON questions USING gin (({SEARCH_DOCUMENT}))')
+    op.execute('CREATE INDEX ix_questions_question_trgm ON questions USING gin (question gin_trgm_ops)')
+    op.execute('CREATE INDEX ix_questions_answer_trgm ON questions USING gin (answer gin_trgm_ops)')
+
+
+def downgrade():
+    op.drop_index('ix_questions_answer_trgm', table_name='questions')
+    op.drop_index('ix_questions_question_trgm', table_name='questions')
+    op.drop_index('ix_questions_search_document', table_name='questions')
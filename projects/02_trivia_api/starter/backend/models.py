@@ -1,6 +1,7 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+from sqlalchemy import Column, String, Integer, ForeignKey, Index, create_engine, inspect
 from flask_sqlalchemy import SQLAlchemy
+from fsnd_db import engine_options
 import json
 
 database_name = "trivia"
@@ -11,13 +12,20 @@ db = SQLAlchemy()
 '''
 setup_db(app)
     binds a flask application and a SQLAlchemy service
+    the connection pool is configured by fsnd_db (see libs/fsnd_db)
+    the tables are created on databases that aren't managed by the
+    migrations yet (without an alembic_version table)
 '''
 def setup_db(app, database_path=database_path):
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config, database_path)
     db.app = app
     db.init_app(app)
-    db.create_all()
+    # Once `flask db upgrade` has run, the migrations create and change the
+    # tables and indexes: create_all() would create them ahead of the migrations
+    if "alembic_version" not in inspect(db.engine).get_table_names():
+        db.create_all()
 
 '''
 Question
@@ -25,11 +33,15 @@ Question
 '''
 class Question(db.Model):  
   __tablename__ = 'questions'
+  __table_args__ = (
+    # Serves the questions of a category in id order (listing, pagination, quiz ids) without a sort
+    Index('ix_questions_category_id', 'category', 'id'),
+  )
 
   id = Column(Integer, primary_key=True)
   question = Column(String)
   answer = Column(String)
-  category = Column(String)
+  category = Column(Integer, ForeignKey('categories.id', name='fk_questions_category', onupdate='CASCADE', ondelete='SET NULL'))
   difficulty = Column(Integer)
 
   def __init__(self, question, answer, category, difficulty):
@@ -1,4 +1,5 @@
 dropdb -U postgres trivia_test
 createdb -U postgres trivia_test
 psql -U postgres trivia_test < trivia.psql
-python3 test_flaskr.py
\ No newline at end of file
+python3 test_flaskr.py
+python3 test_pool_metrics.py
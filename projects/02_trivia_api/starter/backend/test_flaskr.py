@@ -1,10 +1,13 @@
 import os
+import gzip
 import unittest
 import json
-from flask_sqlalchemy import SQLAlchemy
+import threading
 
 from flaskr import create_app
-from models import setup_db, Question, Category
+from flaskr.cache import TTLCache
+from flaskr.search import QuestionSearchIndex
+from models import Question, Category
 
 def helper_valid_get_questions(self, res):
     data = json.loads(res.data)
@@ -27,6 +30,7 @@ def helper_error(self, res, data, error):
         400: 'bad request',
         404: 'not found',
         405: 'method not allowed',
+        415: 'unsupported media type',
         422: 'unprocessable entity'
     }
     self.assertEqual(data['message'], error_to_message[error])
@@ -36,11 +40,11 @@ class TriviaTestCase(unittest.TestCase):
 
     def setUp(self):
         """Define test variables and initialize app."""
-        self.app = create_app()
-        self.client = self.app.test_client
         self.database_name = "trivia_test"
         self.database_path = "postgres://postgres:postgres@{}/{}".format('localhost:5432', self.database_name)
-        setup_db(self.app, self.database_path)
+        # Under pytest, conftest.py provides an app on a SQLite copy of trivia.psql, shared by the tests of a worker
+        self.app = getattr(self, 'shared_app', None) or create_app({'DATABASE_URL': self.database_path})
+        self.client = self.app.test_client
 
         # Setup default categories
         self.categories = {
@@ -59,13 +63,6 @@ class TriviaTestCase(unittest.TestCase):
             'difficulty': 1,
             'category': 6
         }
-
-        # binds the app to the current context
-        with self.app.app_context():
-            self.db = SQLAlchemy()
-            self.db.init_app(self.app)
-            # create all tables
-            self.db.create_all()
     
     def tearDown(self):
         """Executed after reach test"""
@@ -85,6 +82,22 @@ class TriviaTestCase(unittest.TestCase):
         for key in categories:
             self.assertEqual(categories[key], self.categories[key])
     
+    def test_get_categories_not_modified(self):
+        etag = self.client().get('/categories').headers['ETag']
+        res = self.client().get('/categories', headers={'If-None-Match': etag})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.headers['ETag'], etag)
+        self.assertEqual(res.data, b'')
+
+    def test_get_categories_changed_etag(self):
+        res = self.client().get('/categories', headers={'If-None-Match': '"outdated"'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertNotEqual(res.headers['ETag'], '"outdated"')
+
     def test_get_questions_no_page(self):
         res = self.client().get('/questions')
         helper_valid_get_questions(self, res)        
@@ -93,12 +106,39 @@ class TriviaTestCase(unittest.TestCase):
         res = self.client().get('/questions?page=1')
         helper_valid_get_questions(self, res)
 
+    def test_get_questions_gzip(self):
+        res = self.client().get('/questions', headers={'Accept-Encoding': 'gzip'})
+        data = json.loads(gzip.decompress(res.data))
+
+        self.assertEqual(res.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res.headers['Vary'])
+        self.assertTrue(data['success'])
+        self.assertEqual(len(data['questions']), 10)
+
     def test_get_questions_invalid_page(self):
         res = self.client().get('/questions?page={}'.format(10000))
         data = json.loads(res.data)
 
         helper_error(self, res, data, 404)
 
+    def test_get_questions_after_id(self):
+        res = self.client().get('/questions?after_id=0')
+        helper_valid_get_questions(self, res)
+        first_page = json.loads(res.data)
+        self.assertEqual(first_page['next_after_id'], first_page['questions'][-1]['id'])
+
+        res = self.client().get('/questions?after_id={}'.format(first_page['next_after_id']))
+        helper_valid_get_questions(self, res)
+        second_page = json.loads(res.data)
+        self.assertTrue(all(question['id'] > first_page['next_after_id'] for question in second_page['questions']))
+
+    def test_get_questions_after_last_id(self):
+        last_id = Question.query.order_by(Question.id.desc()).first().id
+        res = self.client().get('/questions?after_id={}'.format(last_id))
+        data = json.loads(res.data)
+
+        helper_error(self, res, data, 404)
+
     def test_delete_valid_question(self):
         question = Question(**self.question)
         question.insert()
@@ -149,6 +189,53 @@ class TriviaTestCase(unittest.TestCase):
 
         helper_error(self, res, data, 400)
 
+    def test_import_questions(self):
+        original_count = Question.query.count()
+        lines = [
+            json.dumps(dict(self.question, question='Imported question 1?')),
+            'not json',
+            json.dumps(dict(self.question, question='Imported question 2?', category=1000)),
+            json.dumps(dict(self.question, question='Imported question 3?', category='2'))
+        ]
+        res = self.client().post('/questions/import', data='\n'.join(lines), content_type='application/x-ndjson')
+        data = json.loads(res.data)
+
+        imported = Question.query.filter(Question.question.like('Imported question %'))
+        imported_categories = sorted(question.category for question in imported)
+        imported.delete(synchronize_session=False)
+        Question.query.session.commit()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['read'], 4)
+        self.assertEqual(data['inserted'], 2)
+        self.assertEqual(data['invalid'], 2)
+        self.assertEqual([error['line'] for error in data['errors']], [2, 3])
+        self.assertEqual(imported_categories, [2, 6])
+        self.assertEqual(Question.query.count(), original_count)
+
+    def test_import_questions_unsupported_content_type(self):
+        res = self.client().post('/questions/import', data='question', content_type='text/plain')
+        data = json.loads(res.data)
+
+        helper_error(self, res, data, 415)
+
+    def test_export_questions_csv(self):
+        res = self.client().get('/questions/export?format=csv&category=1')
+        lines = res.data.decode().splitlines()
+        ids = [question.id for question in Question.query.filter(Question.category == 1).order_by(Question.id)]
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.mimetype, 'text/csv')
+        self.assertEqual(lines[0], 'id,question,answer,category,difficulty')
+        self.assertEqual([int(line.split(',', 1)[0]) for line in lines[1:]], ids)
+
+    def test_export_questions_invalid_format(self):
+        res = self.client().get('/questions/export?format=xml')
+        data = json.loads(res.data)
+
+        helper_error(self, res, data, 400)
+
     def test_search_question_with_results(self):
         res = self.client().post('/questions', json={'searchTerm': 'what'})
         data = json.loads(res.data)
@@ -169,6 +256,25 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['total_questions'], 0)
         self.assertIsNone(data['current_category'])
 
+    def test_search_question_by_answer(self):
+        res = self.client().post('/questions', json={'searchTerm': 'muhammad'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertIn(9, [question['id'] for question in data['questions']])
+        self.assertIsNone(data['current_category'])
+
+    def test_search_question_ranks_question_matches_first(self):
+        res = self.client().post('/questions', json={'searchTerm': 'blood'})
+        data = json.loads(res.data)
+        questions = data['questions']
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['total_questions'], len(questions))
+        in_question = ['blood' in question['question'].lower() for question in questions]
+        self.assertEqual(in_question, sorted(in_question, reverse=True))
+
     def test_get_questions_by_category(self):
         category = 1
         res = self.client().get(f'/categories/{category}/questions')
@@ -183,6 +289,21 @@ class TriviaTestCase(unittest.TestCase):
         for question in data['questions']:
             self.assertEqual(question['category'], category)
 
+    def test_get_questions_by_category_after_id(self):
+        category = 1
+        expected_ids = [question.id for question in Question.query.filter(Question.category == category).order_by(Question.id)]
+        ids = []
+        after_id = 0
+        while after_id is not None:
+            res = self.client().get(f'/categories/{category}/questions?after_id={after_id}')
+            data = json.loads(res.data)
+
+            self.assertEqual(res.status_code, 200)
+            ids += [question['id'] for question in data['questions']]
+            after_id = data['next_after_id']
+
+        self.assertEqual(ids, expected_ids)
+
     def test_get_questions_by_category_invalid_page(self):
         res = self.client().get('/categories/1/questions?page={}'.format(10000))
         data = json.loads(res.data)
@@ -221,6 +342,118 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['question']['category'], category)
         self.assertEqual(data['question']['id'], 22)
 
+    def test_generate_question_for_game_plays_whole_category(self):
+        category = 1
+        quiz_category = {'type': self.categories[str(category)], 'id': category}
+        previous_questions = []
+        while True:
+            res = self.client().post('/quizzes', json={'previous_questions': previous_questions, 'quiz_category': quiz_category})
+            question = json.loads(res.data)['question']
+            if question is None:
+                break
+            self.assertNotIn(question['id'], previous_questions)
+            self.assertEqual(question['category'], category)
+            previous_questions.append(question['id'])
+
+        self.assertEqual(len(previous_questions), Question.query.filter(Question.category == category).count())
+
+    def test_quiz_session_plays_whole_category(self):
+        category = 1
+        quiz_category = {'type': self.categories[str(category)], 'id': category}
+        res = self.client().post('/quizzes/sessions', json={'quiz_category': quiz_category})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 201)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['total_questions'], Question.query.filter(Question.category == category).count())
+
+        played = []
+        while True:
+            res = self.client().post('/quizzes/sessions/{}/next'.format(data['session']))
+            question = json.loads(res.data)['question']
+            if question is None:
+                break
+            self.assertEqual(question['category'], category)
+            played.append(question['id'])
+
+        self.assertEqual(len(played), data['total_questions'])
+        self.assertEqual(len(set(played)), len(played))
+
+        res = self.client().delete('/quizzes/sessions/{}'.format(data['session']))
+        self.assertEqual(res.status_code, 200)
+
+    def test_quiz_session_sparse_ids(self):
+        # Ids far apart: the deck is shuffled over the questions, not over the range of their ids
+        category = 1
+        for offset, question_id in enumerate((10 ** 6, 10 ** 7, 10 ** 9)):
+            question = Question('Sparse question {}'.format(offset), 'Answer', category, 1)
+            question.id = question_id
+            question.insert()
+        quiz_category = {'type': self.categories[str(category)], 'id': category}
+        res = self.client().post('/quizzes/sessions', json={'quiz_category': quiz_category})
+        data = json.loads(res.data)
+
+        self.assertEqual(data['total_questions'], Question.query.filter(Question.category == category).count())
+        played = []
+        for _ in range(data['total_questions'] + 1):
+            res = self.client().post('/quizzes/sessions/{}/next'.format(data['session']))
+            question = json.loads(res.data)['question']
+            if question is None:
+                break
+            played.append(question['id'])
+
+        self.assertEqual(sorted(played), [question.id for question in Question.query.filter(Question.category == category).order_by(Question.id)])
+
+    def test_quiz_session_unknown_token(self):
+        res = self.client().post('/quizzes/sessions/not_a_session/next')
+        data = json.loads(res.data)
+
+        helper_error(self, res, data, 404)
+
+    def test_quiz_session_category_id_of_the_frontend(self):
+        res = self.client().post('/quizzes/sessions', json={'quiz_category': {'type': 'Science', 'id': '1'}})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(data['total_questions'], Question.query.filter(Question.category == 1).count())
+
+    def test_quiz_invalid_category_id(self):
+        for category_id in ([1], {'id': 1}, 'science', True):
+            res = self.client().post('/quizzes/sessions', json={'quiz_category': {'id': category_id}})
+            helper_error(self, res, json.loads(res.data), 400)
+            res = self.client().post('/quizzes', json={'previous_questions': [], 'quiz_category': {'id': category_id}})
+            helper_error(self, res, json.loads(res.data), 400)
+        res = self.client().post('/quizzes', json={'previous_questions': [], 'quiz_category': 'science'})
+        helper_error(self, res, json.loads(res.data), 400)
+
+    def test_quiz_session_concurrent_turns_draw_different_questions(self):
+        category = 1
+        res = self.client().post('/quizzes/sessions', json={'quiz_category': {'id': category}})
+        token = json.loads(res.data)['session']
+        total = Question.query.filter(Question.category == category).count()
+        barrier = threading.Barrier(total)
+        question_ids = []
+
+        def turn():
+            barrier.wait(5)
+            res = self.client().post('/quizzes/sessions/{}/next'.format(token))
+            question_ids.append(json.loads(res.data)['question']['id'])
+
+        threads = [threading.Thread(target=turn) for _ in range(total)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(question_ids), total)
+        self.assertEqual(len(set(question_ids)), total)
+
+    def test_quiz_session_missing_category(self):
+        res = self.client().post('/quizzes/sessions', json={})
+        data = json.loads(res.data)
+
+        helper_error(self, res, data, 400)
+
     def test_generate_question_for_game_missing_body(self):
         res = self.client().post('/quizzes')
         data = json.loads(res.data)
@@ -233,6 +466,17 @@ class TriviaTestCase(unittest.TestCase):
 
         helper_error(self, res, data, 400)
 
+    def test_get_metrics(self):
+        self.client().get('/questions')
+        res = self.client().get('/metrics')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['pool']['class'], 'InstrumentedQueuePool')
+        self.assertTrue(data['pool']['checkouts'] > 0)
+        self.assertEqual(sum(data['pool']['checkout_latency_ms']['buckets'].values()), data['pool']['checkouts'])
+
     def test_generate_question_for_game_invalid_method(self):
         res = self.client().get('/quizzes')
         data = json.loads(res.data)
@@ -241,6 +485,73 @@ class TriviaTestCase(unittest.TestCase):
 
 
 
+class TTLCacheTestCase(unittest.TestCase):
+    """This class represents the cache of counts and quiz pools"""
+
+    def test_least_recently_used_entry_is_dropped(self):
+        cache = TTLCache(60, max_entries=2)
+        cache.get_or_set(1, lambda: 'one')
+        cache.get_or_set(2, lambda: 'two')
+        cache.get_or_set(1, lambda: 'stale')
+        cache.get_or_set(3, lambda: 'three')
+
+        self.assertEqual(list(cache.entries), [1, 3])
+        self.assertEqual(cache.get_or_set(1, lambda: 'stale'), 'one')
+
+    def test_concurrent_misses_build_once(self):
+        cache = TTLCache(60)
+        started = threading.Event()
+        release = threading.Event()
+        builds = []
+
+        def build():
+            builds.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_set('key', build)))
+                   for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(builds, [1])
+        self.assertEqual(results, ['value'] * 4)
+
+    def test_value_built_during_an_invalidation_is_not_kept(self):
+        cache = TTLCache(60)
+
+        def build():
+            cache.invalidate('key')
+            return 'old'
+
+        self.assertEqual(cache.get_or_set('key', build), 'old')
+        self.assertEqual(cache.get_or_set('key', lambda: 'new'), 'new')
+
+class QuestionSearchIndexTestCase(unittest.TestCase):
+    """This class represents the search of questions on databases other than PostgreSQL"""
+
+    def setUp(self):
+        self.index = QuestionSearchIndex()
+        self.index.add(1, 'What boxer was originally named Cassius Clay?', 'Muhammad Ali')
+        self.index.add(2, 'Which is the only team to play in every soccer World Cup?', 'Brazil')
+        self.index.add(3, 'Who invented Peanut Butter?', 'George Washington Carver')
+
+    def test_substring_matches_of_any_length(self):
+        for term in ('x', 'ssi', 'SSIUS CL', 'r was orig'):
+            self.assertEqual(self.index.search(term), [1])
+        self.assertEqual(self.index.search('ngton car'), [3])
+        self.assertEqual(self.index.search('ssius muham'), [])
+
+    def test_question_matches_rank_before_answer_matches(self):
+        self.assertEqual(self.index.search('wa'), [1, 3])
+        self.assertEqual(self.index.search('zil'), [2])
 
 
 # Make the tests conveniently executable
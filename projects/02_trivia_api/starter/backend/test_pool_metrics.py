@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from fsnd_db import InstrumentedQueuePool, engine_options, pool_metrics, pool_options
+
+
+class PoolMetricsTestCase(unittest.TestCase):
+    """The connection pool of libs/fsnd_db, shared with the coffee shop backend"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database_path = 'sqlite:///{}'.format(os.path.join(self.directory, 'pool.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pool_options_from_config_then_environment(self):
+        options = pool_options({'DB_POOL_SIZE': 2, 'DB_POOL_TIMEOUT': ''},
+                               {'DB_POOL_SIZE': '20', 'DB_MAX_OVERFLOW': '3', 'DB_POOL_PRE_PING': 'yes'})
+        self.assertEqual(options, {'pool_size': 2, 'max_overflow': 3, 'pool_pre_ping': True})
+
+    def test_engine_options(self):
+        options = engine_options({'DB_POOL_SIZE': '2', 'DB_POOL_RECYCLE': '60'}, self.database_path, {})
+        self.assertEqual(options['poolclass'], InstrumentedQueuePool)
+        self.assertEqual(options['pool_size'], 2)
+        self.assertEqual(options['connect_args'], {'check_same_thread': False})
+
+        # In-memory SQLite has no pool to size
+        options = engine_options({'DB_POOL_SIZE': '2', 'DB_POOL_RECYCLE': '60'}, 'sqlite://', {})
+        self.assertEqual(options, {'pool_recycle': 60})
+
+    def test_waits_and_timeouts_are_counted(self):
+        engine = create_engine(self.database_path, **engine_options(
+            {'DB_POOL_SIZE': 1, 'DB_MAX_OVERFLOW': 0, 'DB_POOL_TIMEOUT': 0.05}, self.database_path, {}))
+        connection = engine.connect()
+        with self.assertRaises(PoolTimeoutError):
+            engine.connect()
+        connection.close()
+        engine.connect().close()
+
+        metrics = pool_metrics(engine)
+        self.assertEqual(metrics['class'], 'InstrumentedQueuePool')
+        self.assertEqual((metrics['size'], metrics['checked_out'], metrics['checked_in']), (1, 0, 1))
+        self.assertEqual((metrics['checkouts'], metrics['waits'], metrics['timeouts']), (2, 1, 1))
+        self.assertEqual(sum(metrics['checkout_latency_ms']['buckets'].values()), 2)
+
+        # dispose() replaces the pool, not its counters
+        engine.dispose()
+        engine.connect().close()
+        self.assertEqual(pool_metrics(engine)['checkouts'], 3)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+# Benchmark of the auth overhead of a request, with and without the token cache.
+#
+# Times requires_auth() on calls made by CLIENTS clients, each with its own
+# bearer token (clients making many calls within one token lifetime): the
+# header parse, verify_decode_jwt() and check_permissions(), with the
+# verified-token cache of fsnd_auth (libs/fsnd_auth) turned off and on. The
+# signing key is the test key of jwt_fixtures.py, served by a stub JWKS
+# store, so no network or database is needed.
+#
+#   python benchmarks/bench_auth.py
+
+import os
+import sys
+import timeit
+import itertools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from fsnd_auth import JWKSStore, TokenCache, parse_rsa_key
+
+from src.auth.auth import auth0
+from jwt_fixtures import TEST_JWK, make_token
+
+RUNS = 2000
+CLIENTS = 100
+
+
+class NoCache(TokenCache):
+    def get(self, token):
+        return None
+
+    def put(self, token, claims, value=None):
+        pass
+
+
+def per_call(run):
+    return min(timeit.repeat(run, number=RUNS, repeat=3)) / RUNS
+
+
+def main():
+    app = Flask(__name__)
+    auth0.jwks_store = JWKSStore('stub', parse_key=parse_rsa_key, fetch=lambda: ({'keys': [TEST_JWK]}, None))
+
+    def endpoint():
+        return 'ok'
+    protected = auth0.requires_auth('get:drinks-detail')(endpoint)
+
+    permissions = ['get:drinks-detail', 'post:drinks', 'patch:drinks', 'delete:drinks']
+    contexts = [app.test_request_context(headers={'Authorization': f'Bearer {make_token(permissions, sub=f"auth0|client-{i}")}'})
+                for i in range(CLIENTS)]
+    calls = itertools.count()
+
+    def request(view):
+        # The clients take turns, each calling with its own token
+        with contexts[next(calls) % CLIENTS]:
+            view()
+
+    # The request context alone, subtracted from the timings below
+    baseline = per_call(lambda: request(endpoint))
+    timings = {}
+    for label, cache in (('no cache', NoCache()), ('token cache', TokenCache())):
+        auth0.token_cache = cache
+        for _ in range(CLIENTS):
+            request(protected)
+        timings[label] = per_call(lambda: request(protected)) - baseline
+        print(f'{label:<12} {timings[label] * 1e6:8.1f} us of auth per request')
+
+    print(f'\n{CLIENTS} clients, x{timings["no cache"] / timings["token cache"]:.1f} faster with the cache   {auth0.token_cache.stats()}')
+    print('\nper stage, ms:')
+    for stage, timing in auth0.metrics.format()['stages_ms'].items():
+        print(f'  {stage:<18} average {timing["average"]:7.3f}   max {timing["max"]:7.3f}   ({timing["count"]} tokens)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# Benchmark of GET /drinks on a menu of 50k drinks.
+#
+# Times the listing the way it was done before the recipe column became
+# JSON (every row loaded with its recipe text, json.loads() in every
+# short()), then Drink.all_short() and GET /drinks with the short() memo of
+# src/database/models.py cold (after a restart) and warm (drinks already
+# serialized at their current version), and after 1% of the drinks changed.
+#
+# Runs on a throwaway SQLite database in a temporary directory, or on
+# DATABASE_URL when it is set (an empty, migrated throwaway database):
+#   python benchmarks/bench_drinks.py
+
+import os
+import sys
+import json
+import random
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+directory = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{os.path.join(directory, "bench_drinks.db")}')
+
+from flask import jsonify
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.ext.declarative import declarative_base
+
+from src.api import app
+from src.database.models import db, Drink, short_cache
+
+NUM_DRINKS = 50000
+CHANGED = NUM_DRINKS // 100
+RUNS = 5
+COLORS = ('white', 'brown', 'lightgray', '#85461e', '#f5be67', '#e6e8eb', '#faacac', 'green', 'purple')
+INGREDIENTS = ('Milk', 'Coffee', 'Whipped Cream', 'Caramel Sauce', 'Chocolate', 'Water', 'Ice', 'Syrup')
+
+
+def recipe(rng):
+    return [{'name': rng.choice(INGREDIENTS), 'color': rng.choice(COLORS), 'parts': rng.randint(1, 3)}
+            for _ in range(rng.randint(1, 5))]
+
+
+def seed():
+    rng = random.Random(42)
+    db.create_all()
+    if Drink.query.count():
+        sys.exit('The benchmark database must be empty - set DATABASE_URL to a throwaway database.')
+    for start in range(0, NUM_DRINKS, 5000):
+        db.session.bulk_save_objects([Drink(title=f'Drink {i}', recipe=recipe(rng))
+                                      for i in range(start, start + 5000)])
+        db.session.commit()
+
+
+class LegacyDrink(declarative_base()):
+    # The Drink model before: the recipe as text, parsed by every short()
+    __tablename__ = 'drink'
+    id = Column(Integer, primary_key=True)
+    title = Column(String(80), unique=True)
+    recipe = Column(String(180), nullable=False)
+
+    def short(self):
+        short_recipe = [{'color': r['color'], 'parts': r['parts']} for r in json.loads(self.recipe)]
+        return {
+            'id': self.id,
+            'title': self.title,
+            'recipe': short_recipe
+        }
+
+
+def legacy_listing():
+    # GET /drinks before
+    drinks = db.session.query(LegacyDrink).order_by(LegacyDrink.id).all()
+    return jsonify({
+        'success': True,
+        'drinks': [drink.short() for drink in drinks]
+    })
+
+
+def best(run, setup=None):
+    timings = []
+    for _ in range(RUNS):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+        db.session.remove()
+    return min(timings)
+
+
+def change_drinks():
+    short_cache.clear()
+    Drink.all_short()
+    for drink in Drink.query.filter(Drink.id <= CHANGED):
+        drink.recipe = list(reversed(drink.recipe))
+    db.session.commit()
+    db.session.remove()
+
+
+def main():
+    client = app.test_client()
+    with app.app_context():
+        seed()
+        try:
+            results = [
+                ('GET /drinks before', best(lambda: legacy_listing().get_data())),
+                ('all_short(), cold', best(Drink.all_short, short_cache.clear)),
+                ('all_short(), warm', best(Drink.all_short)),
+                (f'all_short(), {CHANGED} changed', best(Drink.all_short, change_drinks)),
+                ('GET /drinks, cold', best(lambda: client.get('/drinks'), short_cache.clear)),
+                ('GET /drinks, warm', best(lambda: client.get('/drinks')))
+            ]
+            for label, timing in results:
+                print(f'{label:<26} {timing * 1000:8.1f} ms')
+            assert len(client.get('/drinks').get_json()['drinks']) == NUM_DRINKS
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
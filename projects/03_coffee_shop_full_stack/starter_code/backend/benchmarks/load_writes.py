@@ -0,0 +1,107 @@
+# Load test of the write endpoints as the menu grows.
+#
+# Grows the drink table to each of MENU_SIZES drinks and, at every size,
+# sends WRITES requests alternating POST /drinks and PATCH /drinks/<id>
+# with the default response (the affected drink), then LEGACY_WRITES with
+# ?drinks=all (every drink, as the API answered before). Prints the median,
+# 95th percentile and max latency of each: with the affected drink, the
+# latency of a write stays flat whatever the size of the menu.
+#
+# The tokens are signed with the test key of jwt_fixtures.py, served by a
+# stub JWKS store. Runs on a throwaway SQLite database in a temporary
+# directory, or on DATABASE_URL when it is set (an empty, migrated
+# throwaway database):
+#   python benchmarks/load_writes.py
+
+import os
+import sys
+import random
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+directory = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{os.path.join(directory, "load_writes.db")}')
+
+from fsnd_auth import JWKSStore, parse_rsa_key
+
+from src.api import app
+from src.auth.auth import auth0
+from src.database.models import db, Drink
+from jwt_fixtures import TEST_JWK, make_token
+
+MENU_SIZES = (100, 1000, 10000, 50000)
+WRITES = 200
+# Fewer: they take seconds each on the largest menus
+LEGACY_WRITES = 20
+COLORS = ('white', 'brown', 'lightgray', '#85461e', '#f5be67', '#e6e8eb', '#faacac', 'green', 'purple')
+INGREDIENTS = ('Milk', 'Coffee', 'Whipped Cream', 'Caramel Sauce', 'Chocolate', 'Water', 'Ice', 'Syrup')
+
+
+def recipe(rng):
+    return [{'name': rng.choice(INGREDIENTS), 'color': rng.choice(COLORS), 'parts': rng.randint(1, 3)}
+            for _ in range(rng.randint(1, 5))]
+
+
+def grow(rng, size):
+    count = Drink.query.count()
+    for start in range(count, size, 5000):
+        db.session.bulk_save_objects([Drink(title=f'Drink {i}', recipe=recipe(rng))
+                                      for i in range(start, min(start + 5000, size))])
+        db.session.commit()
+    db.session.remove()
+
+
+def percentile(timings, fraction):
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+def run_writes(client, rng, headers, query, writes):
+    timings = []
+    created = []
+    for i in range(writes):
+        if i % 2 == 0:
+            body = {'title': f'Load {rng.getrandbits(64):x}', 'recipe': recipe(rng)}
+            start = time.perf_counter()
+            response = client.post(f'/drinks{query}', json=body, headers=headers)
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 201, response.get_json()
+            created.append(next(drink['id'] for drink in response.get_json()['drinks'] if drink['title'] == body['title']))
+        else:
+            start = time.perf_counter()
+            response = client.patch(f'/drinks/{created[-1]}{query}', json={'recipe': recipe(rng)}, headers=headers)
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_json()
+
+    # Back to the size of the menu before the run
+    for id in created:
+        client.delete(f'/drinks/{id}', headers=headers)
+    return sorted(timings)
+
+
+def main():
+    auth0.jwks_store = JWKSStore('stub', parse_key=parse_rsa_key, fetch=lambda: ({'keys': [TEST_JWK]}, None))
+    headers = {'Authorization': f'Bearer {make_token(["post:drinks", "patch:drinks", "delete:drinks"])}'}
+    client = app.test_client()
+    rng = random.Random(42)
+
+    with app.app_context():
+        db.create_all()
+        if Drink.query.count():
+            sys.exit('The load test database must be empty - set DATABASE_URL to a throwaway database.')
+        try:
+            print(f'{"drinks":>8}  {"response":<10} {"p50 ms":>8} {"p95 ms":>8} {"max ms":>8}')
+            for size in MENU_SIZES:
+                grow(rng, size)
+                for label, query, writes in (('affected', '', WRITES), ('all', '?drinks=all', LEGACY_WRITES)):
+                    timings = run_writes(client, rng, headers, query, writes)
+                    print(f'{size:>8}  {label:<10} {percentile(timings, 0.5) * 1000:8.2f} '
+                          f'{percentile(timings, 0.95) * 1000:8.2f} {timings[-1] * 1000:8.2f}')
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""Initial migration
+
+Revision ID: 3b7e0c2f5a18
+Revises: 
+Create Date: 2026-10-18 16:02:41.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7e0c2f5a18'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db_drop_and_create_all() already have the table,
+    # with the same columns: only create it when it is missing
+    if 'drink' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('drink',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=80), nullable=True),
+        sa.Column('recipe', sa.String(length=180), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('title')
+        )
+
+
+def downgrade():
+    op.drop_table('drink')
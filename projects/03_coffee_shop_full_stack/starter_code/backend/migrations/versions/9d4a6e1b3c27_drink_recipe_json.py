@@ -0,0 +1,45 @@
+"""Store drink recipes as JSON and version the drink rows
+
+Revision ID: 9d4a6e1b3c27
+Revises: 3b7e0c2f5a18
+Create Date: 2026-10-18 16:20:07.551920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4a6e1b3c27'
+down_revision = '3b7e0c2f5a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The recipes already hold the JSON text written by json.dumps(): on
+    # PostgreSQL the column is cast in place, SQLite keeps JSON as text and
+    # only needs the declared type (and the table recreated by batch mode).
+    # version_id changes with every update of a row (see Drink); the existing
+    # rows start at '0', new rows and updates get random versions
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('drink', 'recipe', type_=sa.JSON(), existing_nullable=False,
+                        postgresql_using='recipe::json')
+        op.add_column('drink', sa.Column('version_id', sa.String(length=32), nullable=False, server_default='0'))
+        return
+
+    with op.batch_alter_table('drink', recreate='always') as batch_op:
+        batch_op.alter_column('recipe', type_=sa.JSON(), existing_type=sa.String(length=180), existing_nullable=False)
+        batch_op.add_column(sa.Column('version_id', sa.String(length=32), nullable=False, server_default='0'))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_column('drink', 'version_id')
+        op.alter_column('drink', 'recipe', type_=sa.String(length=180), existing_nullable=False,
+                        postgresql_using='recipe::text')
+        return
+
+    with op.batch_alter_table('drink', recreate='always') as batch_op:
+        batch_op.drop_column('version_id')
+        batch_op.alter_column('recipe', type_=sa.String(length=180), existing_type=sa.JSON(), existing_nullable=False)
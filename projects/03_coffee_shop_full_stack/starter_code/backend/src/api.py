@@ -3,12 +3,15 @@ from flask import Flask, request, jsonify, abort
 from sqlalchemy import exc
 import json
 from flask_cors import CORS
+from flask_migrate import Migrate
+from fsnd_db import pool_metrics
 
-from .database.models import db_drop_and_create_all, setup_db, Drink
-from .auth.auth import AuthError, requires_auth
+from .database.models import db, db_drop_and_create_all, setup_db, Drink
+from .auth.auth import AuthError, auth0, requires_auth
 
 app = Flask(__name__)
 setup_db(app)
+migrate = Migrate(app, db)
 # CORS(app)
 CORS(app, resources={r'/*': {'origins': '*'}})
 
@@ -36,11 +39,9 @@ def after_request(response):
 '''
 @app.route('/drinks')
 def get_drinks():
-    drinks = Drink.query.order_by(Drink.id).all()
-
     return jsonify({
         'success': True,
-        'drinks': [drink.short() for drink in drinks]
+        'drinks': Drink.all_short()
     })
 
 
@@ -77,6 +78,59 @@ def validate_recipe(recipe):
 
     return True
 
+# What POST /drinks and PATCH /drinks/<id> return in "drinks": the created or
+# updated drink, or every drink (the response of the first versions of the API)
+AFFECTED_DRINK = 'affected'
+ALL_DRINKS = 'all'
+DRINKS_RESPONSES = (AFFECTED_DRINK, ALL_DRINKS)
+
+'''
+drinks_response_mode()
+    the response asked for by the "drinks" query parameter (?drinks=all) or,
+    failing that, by a "drinks" preference of the Prefer header
+    (Prefer: drinks=all), and whether it came from the Prefer header
+    it defaults to the affected drink; listing every drink makes the
+    latency of writes grow with the size of the menu
+'''
+def drinks_response_mode():
+    mode = request.args.get('drinks')
+    if mode is not None:
+        if mode not in DRINKS_RESPONSES:
+            abort(400)
+        return mode, False
+
+    for header in request.headers.getlist('Prefer'):
+        for preference in header.split(','):
+            name, _, value = preference.partition(';')[0].partition('=')
+            value = value.strip().strip('"').lower()
+            # Unknown preferences and values are ignored (RFC 7240)
+            if name.strip().lower() == 'drinks' and value in DRINKS_RESPONSES:
+                return value, True
+    return AFFECTED_DRINK, False
+
+'''
+drinks_response(drink, response_mode, status_code)
+    the response of a write: {"success": True, "drinks": [drink.long()]},
+    or every drink in the long form, for the drinks_response_mode() of the
+    request (read before the write, so that a bad mode changes nothing)
+'''
+def drinks_response(drink, response_mode, status_code=200):
+    mode, preferred = response_mode
+    if mode == ALL_DRINKS:
+        drinks = [each.long() for each in Drink.query.order_by(Drink.id).all()]
+    else:
+        drinks = [drink.long()]
+
+    response = jsonify({
+        'success': True,
+        'drinks': drinks
+    })
+    response.status_code = status_code
+    response.vary.add('Prefer')
+    if preferred:
+        response.headers['Preference-Applied'] = f'drinks={mode}'
+    return response
+
 '''
 @DONE implement endpoint
     POST /drinks
@@ -84,11 +138,13 @@ def validate_recipe(recipe):
         it should require the 'post:drinks' permission
         it should contain the drink.long() data representation
     returns status code 201 and json {"success": True, "drinks": drink} where drink an array containing only the newly created drink
+        (every drink with ?drinks=all or "Prefer: drinks=all", see drinks_response_mode())
         or appropriate status code indicating reason for failure
 '''
 @app.route('/drinks', methods=['POST'])
 @requires_auth('post:drinks')
 def post_drink():
+    response_mode = drinks_response_mode()
     body = request.get_json()
     id = body.get('id', -1)
     title = body.get('title', '')
@@ -101,23 +157,17 @@ def post_drink():
 
     # Try to create drink
     try:
-        recipe_str = json.dumps([ob for ob in recipe])
         if id == -1:
-            drink = Drink(title=title, recipe=recipe_str)
+            drink = Drink(title=title, recipe=recipe)
         else:
             # Create with a specific id
-            drink = Drink(id=id, title=title, recipe=recipe_str)
+            drink = Drink(id=id, title=title, recipe=recipe)
 
         drink.insert()
     except:
         abort(422)
 
-    drinks = Drink.query.order_by(Drink.id).all()
-
-    return jsonify({
-        'success': True,
-        'drinks': [drink.long() for drink in drinks]
-    }), 201
+    return drinks_response(drink, response_mode, 201)
 
 
 '''
@@ -129,11 +179,13 @@ def post_drink():
         it should require the 'patch:drinks' permission
         it should contain the drink.long() data representation
     returns status code 200 and json {"success": True, "drinks": drink} where drink an array containing only the updated drink
+        (every drink with ?drinks=all or "Prefer: drinks=all", see drinks_response_mode())
         or appropriate status code indicating reason for failure
 '''
 @app.route('/drinks/<int:id>', methods=['PATCH'])
 @requires_auth('patch:drinks')
 def patch_drink(id):
+    response_mode = drinks_response_mode()
     drink = Drink.query.filter(Drink.id == id).one_or_none()
     if drink is None:
         abort(404)
@@ -149,20 +201,14 @@ def patch_drink(id):
         drink.title = title
     if recipe is not None:
         validate_recipe(recipe)
-        recipe_str = json.dumps([ob for ob in recipe])
-        drink.recipe = recipe_str
+        drink.recipe = recipe
 
     try:
         drink.update()
     except:
         abort(422)
 
-    drinks = Drink.query.order_by(Drink.id).all()
-
-    return jsonify({
-        'success': True,
-        'drinks': [drink.long() for drink in drinks]
-    })
+    return drinks_response(drink, response_mode)
 
 '''
 @DONE implement endpoint
@@ -192,6 +238,22 @@ def delete_drink(id):
         'delete': id
     })
 
+'''
+GET /metrics
+    the state and counters of the database connection pool (see
+    libs/fsnd_db), to tell pool exhaustion (waits, timeouts, slow
+    checkouts) from slow queries, and the counters of the signing key
+    store, of the verified-token cache and the per-stage timings of the
+    token verification (see libs/fsnd_auth)
+'''
+@app.route('/metrics')
+def get_metrics():
+    return jsonify({
+        'success': True,
+        'pool': pool_metrics(db.engine),
+        'auth': auth0.stats()
+    })
+
 ## Error Handling
 '''
 Example error handling for unprocessable entity
@@ -1,180 +1,55 @@
-import json
-from flask import request, _request_ctx_stack, abort
-from functools import wraps
-from jose import jwt
-from urllib.request import urlopen
+from fsnd_auth import Auth, AuthError
 
 
 AUTH0_DOMAIN = 'viniciuslepca.us.auth0.com'
 ALGORITHMS = ['RS256']
 API_AUDIENCE = 'drinks'
 
-## AuthError Exception
 '''
-AuthError Exception
-A standardized way to communicate auth failure modes
+auth0
+    the verification of the access tokens of the drinks API, shared with
+    the BasicFlaskAuth example (see libs/fsnd_auth): the signing keys are
+    fetched once and refreshed in the background, verified tokens are
+    cached until they expire, and the time spent in each stage is counted
 '''
-class AuthError(Exception):
-    def __init__(self, error, status_code):
-        self.error = error
-        self.status_code = status_code
-
+auth0 = Auth(AUTH0_DOMAIN, API_AUDIENCE, ALGORITHMS)
 
 ## Auth Header
 
 '''
-@DONE implement get_token_auth_header() method
-    it should attempt to get the header from the request
-        it should raise an AuthError if no header is present
-    it should attempt to split bearer and the token
-        it should raise an AuthError if the header is malformed
-    return the token part of the header
+get_token_auth_header()
+    the token part of the "Authorization: Bearer <token>" header
+    it raises an AuthError if the header is missing or malformed
 '''
-def get_token_auth_header():
-    # Code based on app.py from the BasicFlaskAuth example
-    auth = request.headers.get('Authorization', None)
-    if not auth:
-        raise AuthError({
-                'code': 'authorization_header_missing',
-                'description': 'Authorization header is expected.'
-        }, 401)
-
-    parts = auth.split()
-    if parts[0].lower() != 'bearer':
-        raise AuthError({
-            'code': 'invalid_header',
-            'description': 'Authorization header must start with "Bearer".'
-        }, 401)
-
-    elif len(parts) == 1:
-        raise AuthError({
-            'code': 'invalid_header',
-            'description': 'Token not found.'
-        }, 401)
-
-    elif len(parts) > 2:
-        raise AuthError({
-            'code': 'invalid_header',
-            'description': 'Authorization header must be bearer token.'
-        }, 401)
-
-    token = parts[1]
-    return token
-
+get_token_auth_header = auth0.get_token_auth_header
 
 '''
-@DONE implement check_permissions(permission, payload) method
+check_permissions(permission, payload)
     @INPUTS
         permission: string permission (i.e. 'post:drink')
         payload: decoded jwt payload
 
-    it should raise an AuthError if permissions are not included in the payload
-        !!NOTE check your RBAC settings in Auth0
-    it should raise an AuthError if the requested permission string is not in the payload permissions array
+    it raises an AuthError if permissions are not included in the payload
+    it raises an AuthError if the requested permission string is not in the payload permissions array
     return true otherwise
 '''
-def check_permissions(permission, payload):
-    if 'permissions' not in payload:
-        raise AuthError({
-            'code': 'invalid_payload',
-            'description': 'Payload does not contain a permissions list.'
-        }, 401)
-
-    if permission not in payload['permissions']:
-        raise AuthError({
-            'code': 'unauthorized',
-            'description': 'Necessary permission is not given.'
-        }, 403)
-
-    return True
+check_permissions = auth0.check_permissions
 
 '''
-@DONE implement verify_decode_jwt(token) method
+verify_decode_jwt(token)
     @INPUTS
         token: a json web token (string)
 
-    it should be an Auth0 token with key id (kid)
-    it should verify the token using Auth0 /.well-known/jwks.json
-    it should decode the payload from the token
-    it should validate the claims
-    return the decoded payload
-
-    !!NOTE urlopen has a common certificate error described here: https://stackoverflow.com/questions/50236117/scraping-ssl-certificate-verify-failed-error-for-http-en-wikipedia-org
+    it verifies the Auth0 token (with a key id, kid) against the keys of
+    /.well-known/jwks.json, validates its claims and returns the decoded payload
 '''
-def verify_decode_jwt(token):
-    # Code based on app.py from the BasicFlaskAuth example
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
-    unverified_header = jwt.get_unverified_header(token)
-    rsa_key = {}
-    if 'kid' not in unverified_header:
-        raise AuthError({
-            'code': 'invalid_header',
-            'description': 'Authorization malformed.'
-        }, 401)
-
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
-    if rsa_key:
-        try:
-            payload = jwt.decode(
-                token,
-                rsa_key,
-                algorithms=ALGORITHMS,
-                audience=API_AUDIENCE,
-                issuer='https://' + AUTH0_DOMAIN + '/'
-            )
-
-            return payload
-
-        except jwt.ExpiredSignatureError:
-            raise AuthError({
-                'code': 'token_expired',
-                'description': 'Token expired.'
-            }, 401)
-
-        except jwt.JWTClaimsError:
-            raise AuthError({
-                'code': 'invalid_claims',
-                'description': 'Incorrect claims. Please, check the audience and issuer.'
-            }, 401)
-        except Exception:
-            raise AuthError({
-                'code': 'invalid_header',
-                'description': 'Unable to parse authentication token.'
-            }, 400)
-
-    raise AuthError({
-                'code': 'invalid_header',
-                'description': 'Unable to find the appropriate key.'
-            }, 400)
+verify_decode_jwt = auth0.verify_decode_jwt
 
 '''
-@DONE implement @requires_auth(permission) decorator method
+@requires_auth(permission) decorator method
     @INPUTS
         permission: string permission (i.e. 'post:drink')
 
-    it should use the get_token_auth_header method to get the token
-    it should use the verify_decode_jwt method to decode the jwt
-    it should use the check_permissions method validate claims and check the requested permission
-    return the decorator which passes the decoded payload to the decorated method
+    it gets the token from the header, verifies it and checks the requested permission
 '''
-def requires_auth(permission=''):
-    def requires_auth_decorator(f):
-        @wraps(f)
-        def wrapper(*args, **kwargs):
-            token = get_token_auth_header()
-            payload = verify_decode_jwt(token)
-            check_permissions(permission, payload)
-            
-            return f(*args, **kwargs)
-
-        return wrapper
-    return requires_auth_decorator
\ No newline at end of file
+requires_auth = auth0.requires_auth
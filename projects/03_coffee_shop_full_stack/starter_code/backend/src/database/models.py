@@ -1,6 +1,10 @@
 import os
-from sqlalchemy import Column, String, Integer
+import threading
+import uuid
+from collections import OrderedDict
+from sqlalchemy import Column, String, Integer, JSON, select
 from flask_sqlalchemy import SQLAlchemy
+from fsnd_db import engine_options
 import json
 
 # Main database
@@ -8,17 +12,20 @@ import json
 # Used for testing
 database_filename = 'test_database.db'
 project_dir = os.path.dirname(os.path.abspath(__file__))
-database_path = "sqlite:///{}".format(os.path.join(project_dir, database_filename))
+database_path = os.environ.get('DATABASE_URL', "sqlite:///{}".format(os.path.join(project_dir, database_filename)))
 
 db = SQLAlchemy()
 
 '''
 setup_db(app)
     binds a flask application and a SQLAlchemy service
+    the database is the sqlite file above, or DATABASE_URL when it is set
+    the connection pool is configured by fsnd_db (see libs/fsnd_db)
 '''
-def setup_db(app):
+def setup_db(app, database_path=database_path):
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config, database_path)
     db.app = app
     db.init_app(app)
 
@@ -31,6 +38,53 @@ db_drop_and_create_all()
 def db_drop_and_create_all():
     db.drop_all()
     db.create_all()
+    short_cache.clear()
+
+'''
+ShortCache
+    short() of the drinks serialized so far, by drink id, for the version
+    of the row it was computed for. A new version replaces the entry of
+    the drink; past `max_entries` drinks, the least recently used ones are
+    dropped.
+'''
+class ShortCache:
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        # id: (version_id, short()), least recently used first
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, id, version_id):
+        with self.lock:
+            entry = self.entries.get(id)
+            if entry is None or entry[0] != version_id:
+                return None
+            self.entries.move_to_end(id)
+            return entry[1]
+
+    def put(self, id, version_id, short):
+        with self.lock:
+            self.entries[id] = (version_id, short)
+            self.entries.move_to_end(id)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, id):
+        with self.lock:
+            self.entries.pop(id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+short_cache = ShortCache(int(os.environ.get('SHORT_CACHE_SIZE', 10000)))
 
 '''
 Drink
@@ -41,21 +95,72 @@ class Drink(db.Model):
     id = Column(Integer().with_variant(Integer, "sqlite"), primary_key=True)
     # String Title
     title = Column(String(80), unique=True)
-    # the ingredients blob - this stores a lazy json blob
+    # the ingredients, stored as JSON and loaded as a list
     # the required datatype is [{'color': string, 'name':string, 'parts':number}]
-    recipe =  Column(String(180), nullable=False)
+    # assign a new list to change it: changes made in place aren't saved
+    recipe = Column(JSON, nullable=False)
+    # a new random version by every insert and update of the row, see
+    # short(); unlike a counter, it can't repeat when an id is reused
+    version_id = Column(String(32), nullable=False)
+
+    __mapper_args__ = {
+        'version_id_col': version_id,
+        'version_id_generator': lambda version: uuid.uuid4().hex
+    }
 
     '''
     short()
         short form representation of the Drink model
+        memoized per row version: computed once for each version of a drink
+        and shared by the requests (and processes, through the version) that
+        serialize the same version again
     '''
     def short(self):
-        short_recipe = [{'color': r['color'], 'parts': r['parts']} for r in json.loads(self.recipe)]
-        return {
-            'id': self.id,
-            'title': self.title,
-            'recipe': short_recipe
+        return self.memoized_short(self.id, self.version_id, self.title, self.recipe)
+
+    @staticmethod
+    def memoized_short(id, version_id, title, recipe):
+        cached = short_cache.get(id, version_id)
+        if cached is not None:
+            return cached
+
+        short = {
+            'id': id,
+            'title': title,
+            'recipe': [{'color': r['color'], 'parts': r['parts']} for r in recipe]
         }
+        short_cache.put(id, version_id, short)
+        return short
+
+    '''
+    all_short()
+        short() of every drink, ordered by id
+        only the drinks without a memoized short() for their current
+        version are read (with their recipes) from the database, as plain
+        rows rather than Drink objects
+    '''
+    @classmethod
+    def all_short(cls):
+        versions = db.session.execute(select([cls.id, cls.version_id]).order_by(cls.id)).fetchall()
+        shorts = {}
+        for id, version_id in versions:
+            cached = short_cache.get(id, version_id)
+            if cached is not None:
+                shorts[id] = cached
+        stale = [id for id, version_id in versions if id not in shorts]
+
+        columns = select([cls.id, cls.version_id, cls.title, cls.recipe])
+        if len(stale) > len(versions) // 2:
+            batches = [columns]
+        else:
+            # SQLite allows 999 parameters per statement
+            batches = [columns.where(cls.id.in_(stale[start:start + 900])) for start in range(0, len(stale), 900)]
+        for batch in batches:
+            for row in db.session.execute(batch):
+                shorts[row[0]] = cls.memoized_short(*row)
+
+        # Drinks deleted since the first query are left out
+        return [shorts[id] for id, version_id in versions if id in shorts]
 
     '''
     long()
@@ -65,7 +170,7 @@ class Drink(db.Model):
         return {
             'id': self.id,
             'title': self.title,
-            'recipe': json.loads(self.recipe)
+            'recipe': self.recipe
         }
 
     '''
@@ -92,6 +197,7 @@ class Drink(db.Model):
     def delete(self):
         db.session.delete(self)
         db.session.commit()
+        short_cache.pop(self.id)
 
     '''
     update()
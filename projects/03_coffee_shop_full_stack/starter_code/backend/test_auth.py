@@ -0,0 +1,189 @@
+import json
+import unittest
+
+from flask import Flask
+from jose import jwt
+from jose.utils import base64url_encode
+from fsnd_auth import JWKSStore, TokenCache, parse_rsa_key
+from fsnd_auth.token_cache import ENTRY_OVERHEAD
+
+from src.auth.auth import AuthError, auth0, check_permissions, requires_auth, verify_decode_jwt
+
+from jwt_fixtures import TEST_JWK, TEST_KID, TEST_PRIVATE_KEY, make_token
+
+
+class VerifyDecodeJWTTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.jwks_store, self.token_cache = auth0.jwks_store, auth0.token_cache
+        auth0.jwks_store = JWKSStore('stub', parse_key=parse_rsa_key, fetch=lambda: ({'keys': [TEST_JWK]}, None))
+        auth0.token_cache = TokenCache()
+
+    def tearDown(self):
+        auth0.jwks_store, auth0.token_cache = self.jwks_store, self.token_cache
+
+    def test_verified_token_is_cached(self):
+        token = make_token(['get:drinks-detail'])
+        payload = verify_decode_jwt(token)
+        self.assertEqual(payload['permissions'], ['get:drinks-detail'])
+        self.assertEqual(auth0.token_cache.stats()['misses'], 1)
+
+        self.assertEqual(verify_decode_jwt(token), payload)
+        self.assertEqual(auth0.token_cache.stats()['hits'], 1)
+
+    def test_invalid_token_is_not_cached(self):
+        token = make_token(aud='another-api')
+        for _ in range(2):
+            with self.assertRaises(AuthError) as context:
+                verify_decode_jwt(token)
+            self.assertEqual(context.exception.error['code'], 'invalid_claims')
+        self.assertEqual(auth0.token_cache.stats()['entries'], 0)
+
+    def test_expired_token(self):
+        with self.assertRaises(AuthError) as context:
+            verify_decode_jwt(make_token(expires_in=-10))
+        self.assertEqual(context.exception.error['code'], 'token_expired')
+
+    def test_tampered_token(self):
+        header, payload, signature = make_token(['get:drinks-detail']).split('.')
+        forged = make_token(['delete:drinks']).split('.')[1]
+        with self.assertRaises(AuthError) as context:
+            verify_decode_jwt('.'.join((header, forged, signature)))
+        self.assertEqual(context.exception.status_code, 401)
+        self.assertEqual(context.exception.error['code'], 'invalid_signature')
+
+    def test_unknown_key(self):
+        token = make_token(kid='unknown')
+        with self.assertRaises(AuthError) as context:
+            verify_decode_jwt(token)
+        self.assertEqual(context.exception.status_code, 400)
+
+    def test_wrong_issuer(self):
+        with self.assertRaises(AuthError) as context:
+            verify_decode_jwt(make_token(iss='https://another-tenant.auth0.com/'))
+        self.assertEqual(context.exception.status_code, 401)
+        self.assertEqual(context.exception.error['code'], 'invalid_claims')
+
+    def test_missing_claims(self):
+        with self.assertRaises(AuthError) as context:
+            verify_decode_jwt(make_token(expires_in=None))
+        self.assertEqual(context.exception.status_code, 401)
+        self.assertEqual(context.exception.error['code'], 'invalid_claims')
+
+        # jose only checks the audience and issuer of the tokens that have them
+        for claim in ('aud', 'iss'):
+            claims = jwt.get_unverified_claims(make_token())
+            del claims[claim]
+            with self.assertRaises(AuthError) as context:
+                verify_decode_jwt(jwt.encode(claims, TEST_PRIVATE_KEY, algorithm='RS256', headers={'kid': TEST_KID}))
+            self.assertEqual(context.exception.error['code'], 'invalid_claims')
+
+    def test_algorithm_must_match_the_key(self):
+        header, payload, signature = make_token(['delete:drinks']).split('.')
+        unsigned = base64url_encode(json.dumps({'alg': 'none', 'kid': TEST_KID}).encode()).decode()
+        claims = jwt.get_unverified_claims(make_token(['delete:drinks']))
+        for token in ('.'.join((unsigned, payload, '')), '.'.join((unsigned, payload, signature)),
+                      jwt.encode(claims, json.dumps(TEST_JWK), algorithm='HS256', headers={'kid': TEST_KID})):
+            with self.assertRaises(AuthError) as context:
+                verify_decode_jwt(token)
+            self.assertEqual(context.exception.status_code, 401)
+            self.assertEqual(context.exception.error['code'], 'invalid_header')
+
+        # Even when the API accepts the algorithm, the key decides
+        algorithms = auth0.algorithms
+        auth0.algorithms = frozenset(('RS256', 'HS256'))
+        try:
+            with self.assertRaises(AuthError) as context:
+                verify_decode_jwt(jwt.encode(claims, 'secret', algorithm='HS256', headers={'kid': TEST_KID}))
+            self.assertEqual(context.exception.status_code, 401)
+        finally:
+            auth0.algorithms = algorithms
+
+    def test_check_permissions(self):
+        payload = verify_decode_jwt(make_token(['get:drinks-detail']))
+        self.assertTrue(check_permissions('get:drinks-detail', payload))
+        with self.assertRaises(AuthError) as context:
+            check_permissions('post:drinks', payload)
+        self.assertEqual(context.exception.status_code, 403)
+        with self.assertRaises(AuthError) as context:
+            check_permissions('post:drinks', {'sub': 'auth0|test'})
+        self.assertEqual(context.exception.status_code, 401)
+
+    def test_requires_auth(self):
+        view = requires_auth('patch:drinks')(lambda: 'ok')
+        app = Flask(__name__)
+        for permissions, status_code in ((['patch:drinks'], None), (['get:drinks-detail'], 403)):
+            token = make_token(permissions)
+            with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+                if status_code is None:
+                    self.assertEqual(view(), 'ok')
+                    continue
+                with self.assertRaises(AuthError) as context:
+                    view()
+                self.assertEqual(context.exception.status_code, status_code)
+
+    def test_stage_metrics(self):
+        token = make_token(['get:drinks-detail'])
+        verify_decode_jwt(token)
+        verify_decode_jwt(token)
+        stats = auth0.stats()['verification']
+        self.assertGreaterEqual(stats['cache_hits'], 1)
+        for stage in ('cache_lookup', 'header_parse', 'key_lookup', 'signature_verify', 'claim_check'):
+            self.assertGreaterEqual(stats['stages_ms'][stage]['count'], 1)
+
+
+class TokenCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000
+        self.cache = TokenCache(max_entries=3, clock=lambda: self.now)
+
+    def test_expiry(self):
+        self.cache.put('token', {'exp': 1010})
+        self.assertEqual(self.cache.get('token'), {'exp': 1010})
+        self.now = 1010
+        self.assertIsNone(self.cache.get('token'))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_tokens_without_exp_or_expired_are_not_cached(self):
+        self.cache.put('no-exp', {'sub': 'a'})
+        self.cache.put('expired', {'exp': 999})
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_expired_entries_are_evicted_first(self):
+        self.cache.put('a', {'exp': 2000})
+        self.cache.put('b', {'exp': 1005})
+        self.cache.put('c', {'exp': 2000})
+        self.now = 1006
+        self.cache.put('d', {'exp': 2000})
+
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertIsNotNone(self.cache.get('d'))
+        self.assertEqual(self.cache.stats()['evictions'], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        for token in ('a', 'b', 'c'):
+            self.cache.put(token, {'exp': 2000})
+        self.cache.get('a')
+        self.cache.put('d', {'exp': 2000})
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_memory_cap(self):
+        claims = {'exp': 2000, 'permissions': ['x' * 100]}
+        size = len('{"exp": 2000, "permissions": ["' + 'x' * 100 + '"]}') + ENTRY_OVERHEAD
+        cache = TokenCache(max_entries=100, max_bytes=2 * size, clock=lambda: self.now)
+        for token in ('a', 'b', 'c'):
+            cache.put(token, claims)
+
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertEqual(cache.stats()['bytes'], 2 * size)
+        self.assertIsNone(cache.get('a'))
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
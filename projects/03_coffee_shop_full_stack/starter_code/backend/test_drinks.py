@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+# The tests drop and create the tables of a throwaway SQLite database
+directory = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE_URL', 'sqlite:///{}'.format(os.path.join(directory, 'test_drinks.db')))
+
+from fsnd_auth import JWKSStore, TokenCache, parse_rsa_key
+
+from src.api import app
+from src.auth.auth import auth0
+from src.database import models
+from src.database.models import db, db_drop_and_create_all, Drink, ShortCache
+
+from jwt_fixtures import TEST_JWK, make_token
+
+
+def tearDownModule():
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class DrinksTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.jwks_store, self.token_cache = auth0.jwks_store, auth0.token_cache
+        auth0.jwks_store = JWKSStore('stub', parse_key=parse_rsa_key, fetch=lambda: ({'keys': [TEST_JWK]}, None))
+        auth0.token_cache = TokenCache()
+        self.client = app.test_client()
+        self.headers = {'Authorization': 'Bearer ' + make_token(['post:drinks', 'patch:drinks', 'delete:drinks'])}
+
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db_drop_and_create_all()
+        self.water = Drink(title='Water', recipe=[{'name': 'Water', 'color': 'blue', 'parts': 1}])
+        self.latte = Drink(title='Latte', recipe=[{'name': 'Milk', 'color': 'white', 'parts': 3},
+                                                  {'name': 'Coffee', 'color': 'brown', 'parts': 1}])
+        self.water.insert()
+        self.latte.insert()
+        self.water_id, self.latte_id = self.water.id, self.latte.id
+
+    def tearDown(self):
+        db.session.remove()
+        self.app_context.pop()
+        auth0.jwks_store, auth0.token_cache = self.jwks_store, self.token_cache
+
+    def test_unchanged_drinks_reuse_short(self):
+        first = Drink.all_short()
+        self.assertEqual([drink['title'] for drink in first], ['Water', 'Latte'])
+        self.assertEqual(first[1]['recipe'], [{'color': 'white', 'parts': 3}, {'color': 'brown', 'parts': 1}])
+
+        second = Drink.all_short()
+        self.assertIs(second[0], first[0])
+        self.assertIs(second[1], first[1])
+
+    def test_patch_invalidates_short(self):
+        water, latte = Drink.all_short()
+        res = self.client.patch(f'/drinks/{self.latte_id}', json={'title': 'Flat White'}, headers=self.headers)
+        self.assertEqual(res.status_code, 200)
+
+        drinks = self.client.get('/drinks').get_json()['drinks']
+        self.assertEqual([drink['title'] for drink in drinks], ['Water', 'Flat White'])
+        self.assertIsNot(Drink.all_short()[1], latte)
+        self.assertIs(Drink.all_short()[0], water)
+
+    def test_deleted_drink_is_dropped(self):
+        Drink.all_short()
+        res = self.client.delete(f'/drinks/{self.water_id}', headers=self.headers)
+        self.assertEqual(res.status_code, 200)
+
+        self.assertEqual(len(models.short_cache), 1)
+        self.assertEqual([drink['title'] for drink in Drink.all_short()], ['Latte'])
+
+    def test_all_short_with_more_drinks_than_the_cache_holds(self):
+        short_cache, models.short_cache = models.short_cache, ShortCache(max_entries=1)
+        try:
+            self.assertEqual([drink['title'] for drink in Drink.all_short()], ['Water', 'Latte'])
+            self.assertEqual([drink['title'] for drink in Drink.all_short()], ['Water', 'Latte'])
+            self.assertEqual(len(models.short_cache), 1)
+        finally:
+            models.short_cache = short_cache
+
+    def test_writes_return_the_affected_drink(self):
+        mocha = {'title': 'Mocha', 'recipe': [{'name': 'Chocolate', 'color': 'brown', 'parts': 1}]}
+        res = self.client.post('/drinks', json=mocha, headers=self.headers)
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual([drink['title'] for drink in res.get_json()['drinks']], ['Mocha'])
+        self.assertIn('Prefer', res.headers['Vary'])
+        self.assertNotIn('Preference-Applied', res.headers)
+
+        res = self.client.patch(f'/drinks/{self.water_id}', json={'title': 'Tap Water'}, headers=self.headers)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_json()['drinks'], [{
+            'id': self.water_id, 'title': 'Tap Water', 'recipe': [{'name': 'Water', 'color': 'blue', 'parts': 1}]}])
+
+    def test_writes_return_every_drink_on_request(self):
+        res = self.client.patch(f'/drinks/{self.water_id}?drinks=all', json={'title': 'Tap Water'},
+                                headers=self.headers)
+        self.assertEqual([drink['title'] for drink in res.get_json()['drinks']], ['Tap Water', 'Latte'])
+        self.assertNotIn('Preference-Applied', res.headers)
+
+        headers = dict(self.headers, Prefer='return=minimal, drinks="all"')
+        res = self.client.post('/drinks', json={'title': 'Mocha', 'recipe': [
+            {'name': 'Chocolate', 'color': 'brown', 'parts': 1}]}, headers=headers)
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual([drink['title'] for drink in res.get_json()['drinks']], ['Tap Water', 'Latte', 'Mocha'])
+        self.assertEqual(res.headers['Preference-Applied'], 'drinks=all')
+
+        # The query parameter wins over the header
+        headers = dict(self.headers, Prefer='drinks=all')
+        res = self.client.patch(f'/drinks/{self.latte_id}?drinks=affected', json={'title': 'Flat White'},
+                                headers=headers)
+        self.assertEqual([drink['title'] for drink in res.get_json()['drinks']], ['Flat White'])
+
+    def test_unknown_response_mode(self):
+        res = self.client.patch(f'/drinks/{self.water_id}?drinks=some', json={'title': 'Tap Water'},
+                                headers=self.headers)
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(res.get_json()['success'])
+        # Nothing was written
+        self.assertEqual(Drink.query.get(self.water_id).title, 'Water')
+
+        # An unknown preference is ignored
+        headers = dict(self.headers, Prefer='drinks=some')
+        res = self.client.patch(f'/drinks/{self.water_id}', json={'title': 'Tap Water'}, headers=headers)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([drink['title'] for drink in res.get_json()['drinks']], ['Tap Water'])
+
+
+class ShortCacheTestCase(unittest.TestCase):
+
+    def test_new_version_replaces_the_entry(self):
+        cache = ShortCache()
+        cache.put(1, 'a', {'id': 1, 'title': 'Water'})
+        cache.put(1, 'b', {'id': 1, 'title': 'Sparkling Water'})
+
+        self.assertIsNone(cache.get(1, 'a'))
+        self.assertEqual(cache.get(1, 'b'), {'id': 1, 'title': 'Sparkling Water'})
+        self.assertEqual(len(cache), 1)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ShortCache(max_entries=2)
+        cache.put(1, 'a', 'water')
+        cache.put(2, 'a', 'latte')
+        cache.get(1, 'a')
+        cache.put(3, 'a', 'mocha')
+
+        self.assertIsNone(cache.get(2, 'a'))
+        self.assertEqual(cache.get(1, 'a'), 'water')
+        self.assertEqual(cache.get(3, 'a'), 'mocha')
+        self.assertEqual(cache.evictions, 1)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fsnd_auth import AuthError, JWKSStore
+
+
+def jwk(kid):
+    return {'kty': 'RSA', 'kid': kid, 'use': 'sig', 'n': 'n-' + kid, 'e': 'AQAB'}
+
+
+class StubJWKSServer:
+    '''
+    A local JWKS endpoint: serves `kids` with `cache_control`, answers 503
+    while `failing` is set and counts the requests it gets
+    '''
+
+    def __init__(self):
+        self.kids = ['key-1']
+        self.cache_control = None
+        self.failing = False
+        self.delay = 0
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.delay)
+                if stub.failing:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = json.dumps({'keys': [jwk(kid) for kid in stub.kids]}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                if stub.cache_control:
+                    self.send_header('Cache-Control', stub.cache_control)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}/.well-known/jwks.json'.format(self.server.server_address[1])
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class JWKSStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubJWKSServer()
+        self.now = 1000.0
+        self.store = JWKSStore(self.stub.url, ttl=600, min_ttl=60, max_ttl=3600, refetch_interval=30,
+                               retry_interval=10, timeout=2, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.stub.close()
+
+    def wait_for_refresh(self):
+        deadline = time.monotonic() + 5
+        while self.store.refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_keys_are_fetched_once(self):
+        for _ in range(10):
+            self.assertEqual(self.store.get('key-1'), jwk('key-1'))
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_cache_control_max_age(self):
+        self.stub.cache_control = 'public, max-age=120, stale-while-revalidate=30'
+        self.store.get('key-1')
+        self.assertEqual(self.store.refresh_at, self.now + 120)
+
+    def test_cache_control_max_age_is_clamped(self):
+        self.stub.cache_control = 'max-age=5'
+        self.store.get('key-1')
+        self.assertEqual(self.store.refresh_at, self.now + 60)
+
+    def test_ttl_without_cache_control(self):
+        self.store.get('key-1')
+        self.assertEqual(self.store.refresh_at, self.now + 600)
+
+    def test_background_refresh_after_ttl(self):
+        self.store.get('key-1')
+        self.stub.kids = ['key-2']
+        self.now += 601
+
+        # Served from the current keys while the refresh runs
+        self.assertEqual(self.store.get('key-1'), jwk('key-1'))
+        self.wait_for_refresh()
+        self.assertEqual(self.stub.requests, 2)
+        self.assertEqual(self.store.get('key-2'), jwk('key-2'))
+        self.assertEqual(self.stub.requests, 2)
+
+    def test_unknown_kid_is_refetched(self):
+        self.store.get('key-1')
+        self.stub.kids = ['key-1', 'key-2']
+
+        self.assertEqual(self.store.get('key-2'), jwk('key-2'))
+        self.assertEqual(self.stub.requests, 2)
+
+    def test_unknown_kid_refetch_is_rate_limited(self):
+        self.store.get('key-1')
+        for _ in range(10):
+            self.assertIsNone(self.store.get('made-up'))
+        self.assertEqual(self.stub.requests, 2)
+
+        self.now += 31
+        self.assertIsNone(self.store.get('made-up'))
+        self.assertEqual(self.stub.requests, 3)
+
+    def test_single_flight(self):
+        self.stub.delay = 0.2
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.store.get('key-1'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [jwk('key-1')] * 8)
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_stale_keys_on_failure(self):
+        self.store.get('key-1')
+        self.stub.failing = True
+        self.now += 601
+
+        self.assertEqual(self.store.get('key-1'), jwk('key-1'))
+        self.wait_for_refresh()
+        self.assertEqual(self.store.get('key-1'), jwk('key-1'))
+        self.assertEqual(self.store.failures, 1)
+        # Retried after retry_interval, not on every request
+        self.assertEqual(self.store.refresh_at, self.now + 10)
+
+    def test_keys_are_parsed_once_per_fetch(self):
+        self.stub.kids = ['key-1', 'bad']
+
+        def parse_key(key):
+            if key['kid'] == 'bad':
+                raise ValueError(key['kid'])
+            return ('parsed', key['kid'])
+
+        store = JWKSStore(self.stub.url, parse_key=parse_key)
+        self.assertEqual(store.get('key-1'), ('parsed', 'key-1'))
+        self.assertEqual(store.get('key-1'), ('parsed', 'key-1'))
+        self.assertEqual(set(store.keys), {'key-1'})
+
+    def test_first_fetch_failure(self):
+        self.stub.failing = True
+        with self.assertRaises(AuthError) as context:
+            self.store.get('key-1')
+        self.assertEqual(context.exception.status_code, 503)
+        self.assertEqual(self.store.keys, {})
+
+        # Not fetched again before retry_interval, even once the provider is back
+        self.stub.failing = False
+        with self.assertRaises(AuthError):
+            self.store.get('key-1')
+        self.assertEqual(self.stub.requests, 1)
+
+        self.now += 10
+        self.assertEqual(self.store.get('key-1'), jwk('key-1'))
+        self.assertEqual(self.stub.requests, 2)
+
+    def test_first_fetch_failure_fails_concurrent_requests_once(self):
+        self.stub.failing = True
+        self.stub.delay = 0.2
+        errors = []
+
+        def get():
+            try:
+                self.store.get('key-1')
+            except AuthError as auth_error:
+                errors.append(auth_error.status_code)
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # The threads that waited for the failed fetch don't start their own
+        self.assertEqual(errors, [503] * 8)
+        self.assertEqual(self.stub.requests, 1)
+        self.assertLess(time.monotonic() - start, 1)
+
+        get()
+        self.assertEqual(errors, [503] * 9)
+        self.assertEqual(self.stub.requests, 1)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()